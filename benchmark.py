@@ -0,0 +1,126 @@
+"""
+Micro-benchmark of hot read & transaction build paths, against an in-process canned provider
+(no network, only Python overhead)
+
+Run from the project folder: python benchmark.py
+"""
+import timeit
+
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from helpers.utils import *
+from web.swapTemplate import SWAP_ETH_FOR_TOKENS, SwapTemplate
+
+ROUNDS = 2000
+WALLET = "0x000000000000000000000000000000000000dEaD"
+ROUTER = "0x10ED43c718714Eb63D5aA57B9b54704E256024e5"
+PRIVATE_KEY = "0x" + "11" * 32  # Throwaway key, transactions are only signed
+
+CANNED = {
+    bytes(GET_RESERVES): (1000 * 10**18).to_bytes(32, "big") + (300000 * 10**18).to_bytes(32, "big") + bytes(32),
+    bytes(BALANCE_OF): (42 * 10**18).to_bytes(32, "big"),
+    bytes(ALLOWANCE): approveAmount.to_bytes(32, "big"),
+}
+
+
+class CannedProvider(BaseProvider):
+    """Answer eth_chainId & eth_call (by selector) instantly, count requests"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def make_request(self, method, params):
+        self.requests += 1
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": self.requests, "result": "0x38"}
+        selector = HexBytes(params[0]["data"])[:4]
+        return {"jsonrpc": "2.0", "id": self.requests, "result": "0x" + CANNED[bytes(selector)].hex()}
+
+    def isConnected(self):
+        return True
+
+
+def old_get_bnb_price(w3: Web3) -> Decimal:
+    """get_bnb_price before the fast path (new contract object & ABI call each time)"""
+    pair_contract = w3.eth.contract(address=busd_bnb_pair_adr, abi=LP_abi)
+    reserve0, reserve1, _ = pair_contract.functions.getReserves().call()
+    return (Decimal(reserve1) / Decimal(reserve0)).quantize(ETHER_NEG)
+
+
+def bench(provider: CannedProvider, name: str, fun):
+    provider.requests = 0
+    seconds = timeit.timeit(fun, number=ROUNDS)
+    print(f"{name:<28}{seconds / ROUNDS * 1e6:>10.1f} us/call{provider.requests / ROUNDS:>8.1f} requests/call")
+    return seconds
+
+
+def main():
+    provider = CannedProvider()
+    w3 = Web3(provider)
+    pair_contract = w3.eth.contract(address=busd_bnb_pair_adr, abi=LP_abi)
+    token_contract = w3.eth.contract(address=BUSD, abi=standard_abi)
+
+    cases = [
+        (
+            "getReserves",
+            lambda: tuple(pair_contract.functions.getReserves().call()[:2]),
+            lambda: fast_reserves(w3, busd_bnb_pair_adr),
+        ),
+        (
+            "balanceOf",
+            lambda: token_contract.functions.balanceOf(WALLET).call(),
+            lambda: fast_uint(w3, BUSD, BALANCE_OF, WALLET),
+        ),
+        (
+            "allowance",
+            lambda: token_contract.functions.allowance(WALLET, ROUTER).call(),
+            lambda: fast_uint(w3, BUSD, ALLOWANCE, WALLET, ROUTER),
+        ),
+        ("get_bnb_price", lambda: old_get_bnb_price(w3), lambda: get_bnb_price(w3)),
+    ]
+    for name, contract_path, fast_path in cases:
+        assert contract_path() == fast_path()
+        contract_time = bench(provider, name + " (contract)", contract_path)
+        fast_time = bench(provider, name + " (fast)", fast_path)
+        print(f"{'':<28}x{contract_time / fast_time:.1f} faster\n")
+
+    # Swap transaction build (before signing): buildTransaction (ABI encoding + chain id request) vs template
+    router_contract = w3.eth.contract(address=ROUTER, abi=pancake_swap["ROUTER_ABI"])
+    path = [WBNB, BUSD]
+    template = SwapTemplate(router_contract, SWAP_ETH_FOR_TOKENS, path, WALLET)
+    chain_id = w3.eth.chain_id
+    sender = w3.eth.account.from_key(PRIVATE_KEY).address
+    amount_in, amount_out, deadline = 10**17, 30 * 10**18, 2**32
+
+    def build_transaction():
+        function = router_contract.functions.swapExactETHForTokensSupportingFeeOnTransferTokens(
+            amount_out, path, WALLET, deadline
+        )
+        return function.buildTransaction(
+            {"from": sender, "value": amount_in, "gasPrice": 5 * 10**9, "gas": 400000, "nonce": 7}
+        )
+
+    def template_transaction():
+        return {
+            "chainId": chain_id,
+            "nonce": 7,
+            "gasPrice": 5 * 10**9,
+            "gas": 400000,
+            "to": ROUTER,
+            "value": amount_in,
+            "data": template.encode(amount_in, amount_out, deadline),
+        }
+
+    def sign(transaction: dict) -> HexBytes:
+        return w3.eth.account.sign_transaction(transaction, PRIVATE_KEY).rawTransaction
+
+    assert sign(build_transaction()) == sign(template_transaction())
+    build_time = bench(provider, "swap (buildTransaction)", build_transaction)
+    template_time = bench(provider, "swap (template)", template_transaction)
+    print(f"{'':<28}x{build_time / template_time:.1f} faster\n")
+    bench(provider, "swap signing (both)", lambda: sign(template_transaction()))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,40 @@ class SettingsCommands(SettingsGui):
            revert_time: Int
 
            max_fail_attempts: Int
+
+           block_poll_interval: Float
+
+           multicall_bootstrap: Bool
+
+           engine: String
+
+           max_concurrent_requests: Int
+
+           rpc_nodes: list[String]
+
+           hedge_delay: Float
+
+           rpc_rate_limit: Float
+
+           rpc_burst: Int
+
+           broadcast_nodes: list[String]
+
+           presign_orders: Bool
+
+           presign_tolerance: Float
+
+           gas_policy: String
+
+           max_gas_price: Float
+
+           speed_up_blocks: Int
+
+           speed_up_bump: Float
+
+           reserve_source: String
+
+           head_subscription: Bool
         """
 
         try:
@@ -60,6 +94,40 @@ class SettingsCommands(SettingsGui):
            revert_time: Int
 
            max_fail_attempts: Int
+
+           block_poll_interval: Float
+
+           multicall_bootstrap: Bool
+
+           engine: String
+
+           max_concurrent_requests: Int
+
+           rpc_nodes: list[String]
+
+           hedge_delay: Float
+
+           rpc_rate_limit: Float
+
+           rpc_burst: Int
+
+           broadcast_nodes: list[String]
+
+           presign_orders: Bool
+
+           presign_tolerance: Float
+
+           gas_policy: String
+
+           max_gas_price: Float
+
+           speed_up_blocks: Int
+
+           speed_up_bump: Float
+
+           reserve_source: String
+
+           head_subscription: Bool
         """
 
         try:
@@ -75,6 +143,23 @@ class SettingsCommands(SettingsGui):
                 "gas_price": max(self.gas_price_var.get(), 5.0),
                 "revert_time": int(max(self.revert_time_var.get(), 5)),
                 "max_fail_attempts": int(max(self.retry_max_var.get(), 0)),
+                "block_poll_interval": self.settings.block_poll_interval,
+                "multicall_bootstrap": self.settings.multicall_bootstrap,
+                "engine": self.engine_var.get() or "Thread",
+                "max_concurrent_requests": self.settings.max_concurrent_requests,
+                "rpc_nodes": self.settings.rpc_nodes,
+                "hedge_delay": self.settings.hedge_delay,
+                "rpc_rate_limit": self.settings.rpc_rate_limit,
+                "rpc_burst": self.settings.rpc_burst,
+                "broadcast_nodes": self.settings.broadcast_nodes,
+                "presign_orders": self.settings.presign_orders,
+                "presign_tolerance": self.settings.presign_tolerance,
+                "gas_policy": self.settings.gas_policy,
+                "max_gas_price": self.settings.max_gas_price,
+                "speed_up_blocks": self.settings.speed_up_blocks,
+                "speed_up_bump": self.settings.speed_up_bump,
+                "reserve_source": self.settings.reserve_source,
+                "head_subscription": self.settings.head_subscription,
             }
             with open(os.path.join(os.getcwd(), "./data/settings.json"), "w") as sFile:
                 json.dump(temp_dict, sFile, indent=4)
@@ -44,6 +44,7 @@ class SettingsGui(Toplevel):
         ttk.Label(self.root_settings, text="Gas Price").grid(row=4, column=0, padx=10)
         ttk.Label(self.root_settings, text="Revert Transaction Time").grid(row=5, column=0, padx=10)
         ttk.Label(self.root_settings, text="Max Fail Transactions").grid(row=6, column=0, padx=10)
+        ttk.Label(self.root_settings, text="Trading Engine").grid(row=7, column=0, padx=10)
 
         # User input
         self.ent_wallet_address = ttk.Entry(self.root_settings, justify="center")
@@ -66,6 +67,10 @@ class SettingsGui(Toplevel):
         self.ent_revert_transaction.grid(row=5, column=1, padx=10, pady=5, sticky="we")
         self.ent_retry_count = ttk.Spinbox(self.root_settings, justify="center", from_=3, to=100, increment=1)
         self.ent_retry_count.grid(row=6, column=1, padx=10, pady=5, sticky="we")
+        self.cBox_engine = ttk.Combobox(
+            self.root_settings, values=["Thread", "Asyncio"], justify="center", state="readonly"
+        )
+        self.cBox_engine.grid(row=7, column=1, padx=10, pady=5, sticky="we")
 
         self.settings = self.get_settings()
         self.init_vars()
@@ -84,6 +89,7 @@ class SettingsGui(Toplevel):
         self.ent_wallet_address.config(state=state)
         self.ent_private_key.config(state=state)
         self.ent_bsc_node.config(state=state)
+        self.cBox_engine.config(state="readonly" if state == "normal" else state)
 
     def init_vars(self):
         self.wallet_var = StringVar(value=self.settings.wallet)
@@ -93,6 +99,7 @@ class SettingsGui(Toplevel):
         self.gas_price_var = DoubleVar(value=self.settings.gas_price)
         self.revert_time_var = IntVar(value=self.settings.revert_time)
         self.retry_max_var = IntVar(value=self.settings.max_fail_attempts)
+        self.engine_var = StringVar(value=self.settings.engine)
 
     def set_vars(self):
         self.ent_wallet_address.config(textvariable=self.wallet_var)
@@ -102,6 +109,7 @@ class SettingsGui(Toplevel):
         self.ent_gas_price.config(textvariable=self.gas_price_var)
         self.ent_revert_transaction.config(textvariable=self.revert_time_var)
         self.ent_retry_count.config(textvariable=self.retry_max_var)
+        self.cBox_engine.config(textvariable=self.engine_var)
 
     def get_settings(self) -> Settings:
         pass
@@ -4,6 +4,7 @@ from tkinter import *
 from gui.trading.tradingGui import TradingGui
 from helpers.settings import Settings
 from helpers.tokens import *
+from web.asyncWebLayer import AsyncWebLayer
 from web.webLayer import WebLayer
 
 
@@ -225,7 +226,10 @@ class TradingCommands(TradingGui):
 
     def start_bot(self):
         """Start Trading Thread & update GUI"""
-        self.web_layer = WebLayer(self.tokens_list, self.settings)
+        if self.settings.engine == "Asyncio":
+            self.web_layer = AsyncWebLayer(self.tokens_list, self.settings)
+        else:
+            self.web_layer = WebLayer(self.tokens_list, self.settings)
         self.btn_pause.config(state="normal")
         self.fields_state_switcher()
         self.update_GUI()
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+""" Constant product (UniswapV2) quotes, same integer math as the DEX router getAmountsOut """
+
+
+def sort_reserves(reserves: tuple[int, int], token_in: str, token_out: str) -> tuple[int, int]:
+    """Pair (reserve0, reserve1) -> (reserve_in, reserve_out), token0 is the lower address"""
+    if int(token_in, 16) < int(token_out, 16):
+        return reserves[0], reserves[1]
+    return reserves[1], reserves[0]
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int, fee: Decimal) -> int:
+    """Output of one swap, `fee` in percent (ex: PancakeSwap 0.25 -> amount_in * 9975 / 10000)"""
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * (10000 - int(Decimal(fee) * 100))
+    return amount_in_with_fee * reserve_out // (reserve_in * 10000 + amount_in_with_fee)
+
+
+def get_amounts_out(amount_in: int, path: list[str], pairs_reserves: list[tuple[int, int]], fee: Decimal) -> int:
+    """Output of a multi-hop swap
+
+    :param path: token addresses (ex: BUSD -> WBNB -> token)
+
+    :param pairs_reserves: (reserve0, reserve1) of each hop pair, len(path) - 1 items
+    """
+    amount = amount_in
+    for i, reserves in enumerate(pairs_reserves):
+        reserve_in, reserve_out = sort_reserves(reserves, path[i], path[i + 1])
+        amount = get_amount_out(amount, reserve_in, reserve_out, fee)
+    return amount
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -12,10 +12,32 @@ class Settings:
     gas_price: float = 5.0
     revert_time: int = 5
     max_fail_attempts: int = 3
+    block_poll_interval: float = 1.0
+    multicall_bootstrap: bool = True
+    engine: str = "Thread"  # Thread or Asyncio
+    max_concurrent_requests: int = 200
+    rpc_nodes: list[str] = field(default_factory=list)  # Extra HTTP nodes, pooled with bcs_node
+    hedge_delay: float = 0.3  # Secs before a pending read is also sent to the second best node
+    rpc_rate_limit: float = 25.0  # Requests per sec sent to the node(s), 0 = no limit
+    rpc_burst: int = 50  # Requests sent at once before rate limiting
+    broadcast_nodes: list[str] = field(default_factory=list)  # HTTP nodes also sent every signed transaction
+    presign_orders: bool = True  # Keep orders that can trigger next signed, ready to send
+    presign_tolerance: float = 0.5  # % quote move re-signing a pre-signed order
+    gas_policy: str = "static"  # static (gas_price), fast (node eth_gasPrice) or percentile N (recent blocks)
+    max_gas_price: float = 20.0  # Gwei, gas_policy price cap (gas_price is the floor)
+    speed_up_blocks: int = 3  # Blocks without receipt before re-sending the same nonce with more gas, 0 = never
+    speed_up_bump: float = 12.5  # % gas price added per speed up (nodes replace from +10 %), up to max_gas_price
+    reserve_source: str = "logs"  # Pairs reserves: logs (mirror fed by Sync events) or multicall (read every block)
+    head_subscription: bool = True  # WebSocket / IPC node: cycles start on pushed new heads (no block polling)
 
     def __repr__(self):
         return (
             f"{self.__class__.__name__}: "
             f"{self.wallet} {self.private_key} {self.bcs_node} {self.gas_amount} {self.gas_price} "
-            f"{self.revert_time} {self.max_fail_attempts}"
+            f"{self.revert_time} {self.max_fail_attempts} {self.block_poll_interval} {self.multicall_bootstrap} "
+            f"{self.engine} {self.max_concurrent_requests} {self.rpc_nodes} {self.hedge_delay} "
+            f"{self.rpc_rate_limit} {self.rpc_burst} {self.broadcast_nodes} "
+            f"{self.presign_orders} {self.presign_tolerance} {self.gas_policy} {self.max_gas_price} "
+            f"{self.speed_up_blocks} {self.speed_up_bump} {self.reserve_source} "
+            f"{self.head_subscription}"
         )
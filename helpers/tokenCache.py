@@ -0,0 +1,101 @@
+import json
+import os
+from threading import Lock
+
+from helpers.tokenPrefetch import TokenPrefetch
+from helpers.utils import default_pair_value
+
+CACHE_FILE = "./data/token_cache.jsonl"
+
+
+class TokenCache:
+    """Token reads that never change, kept between sessions: one JSON line per (DEX factory, token address)
+
+    Symbol, decimals, supply, factory.getPair(token, counter) & pairs token0.
+    Zero address pairs are never stored (pool may be created later). A cached pair failing getReserves
+    (no code, revert) is invalidated by WebLayer, its getPair is read again on the next start
+    """
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = os.path.join(os.getcwd(), path)
+        self.lock = Lock()
+        self.entries: dict[tuple[str, str], dict] = {}
+        self.changed: bool = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as sFile:
+                for line in sFile:
+                    if line.strip() != "":
+                        entry = json.loads(line)
+                        self.entries[(entry["factory"], entry["token"])] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, IOError, KeyError, json.decoder.JSONDecodeError) as e:
+            print("Warning: (Token cache) Ignoring cache file:", e)
+            self.entries.clear()
+
+    def save(self):
+        """Rewrite the cache file if something changed"""
+        with self.lock:
+            if not self.changed:
+                return
+            try:
+                with open(self.path, "w") as sFile:
+                    for entry in self.entries.values():
+                        sFile.write(json.dumps(entry) + "\n")
+                self.changed = False
+            except (OSError, IOError) as e:
+                print("Error (Save token cache):", e)
+
+    def get(self, factory: str, token: str) -> TokenPrefetch:
+        """TokenPrefetch holding the cached values (dynamic ones left None)"""
+        with self.lock:
+            entry = self.entries.get((factory, token), {})
+            return TokenPrefetch(
+                symbol=entry.get("symbol"),
+                decimals=entry.get("decimals"),
+                supply=entry.get("supply"),
+                pairs=dict(entry.get("pairs", {})),
+                token0=dict(entry.get("token0", {})),
+            )
+
+    def put(self, factory: str, token: str, prefetch: TokenPrefetch):
+        """Store the immutable values of `prefetch` (None values are skipped)"""
+        with self.lock:
+            entry = self.entries.setdefault((factory, token), {"factory": factory, "token": token})
+            before = json.dumps(entry, sort_keys=True)
+            for key in ("symbol", "decimals", "supply"):
+                if getattr(prefetch, key) is not None:
+                    entry[key] = getattr(prefetch, key)
+            pairs = entry.setdefault("pairs", {})
+            token0 = entry.setdefault("token0", {})
+            for counter, pair in prefetch.pairs.items():
+                if pair == default_pair_value:
+                    token0.pop(pairs.pop(counter, None), None)
+                else:
+                    pairs[counter] = pair
+            token0.update({pair: address for pair, address in prefetch.token0.items() if pair in pairs.values()})
+            self.changed |= json.dumps(entry, sort_keys=True) != before
+
+    def invalidate(self, factory: str, token: str, counter: str = None):
+        """Forget a token pair with `counter` token, or the whole token entry"""
+        with self.lock:
+            entry = self.entries.get((factory, token))
+            if entry is None:
+                return
+            if counter is None:
+                del self.entries[(factory, token)]
+            else:
+                entry.get("token0", {}).pop(entry.get("pairs", {}).pop(counter, None), None)
+            self.changed = True
+
+    def all_pairs(self) -> dict[tuple[str, str, str], str]:
+        """Every cached pair: (factory, token, counter token) -> pair"""
+        with self.lock:
+            return {
+                (factory, token, counter): pair
+                for (factory, token), entry in self.entries.items()
+                for counter, pair in entry.get("pairs", {}).items()
+            }
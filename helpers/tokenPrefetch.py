@@ -0,0 +1,16 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TokenPrefetch:
+    """Token reads fetched before creating TokenData, a None/missing value is read by TokenData itself"""
+
+    allowance: int = None
+    symbol: str = None
+    decimals: int = None
+    supply: int = None
+    balance: int = None
+    pairs: dict[str, str] = field(default_factory=dict)  # Counter token address -> pair address
+    reserves: dict[str, tuple[int, int]] = field(default_factory=dict)  # Pair address -> (reserve0, reserve1)
+    token0: dict[str, str] = field(default_factory=dict)  # Pair address -> token0 address
+    invalid_pairs: list[str] = field(default_factory=list)  # Counter tokens whose cached pair isn't a pair
@@ -1,11 +1,16 @@
+import functools
 import json
+import math
 import time
 from datetime import datetime, timezone
 from decimal import Decimal
 from enum import Enum
+from fractions import Fraction
+from typing import Any, Callable
 
+import requests
 from hexbytes import HexBytes
-from web3 import Web3, contract
+from web3 import HTTPProvider, Web3, contract
 
 from helpers.tokens import LimitTrade
 
@@ -13,6 +18,7 @@ from helpers.tokens import LimitTrade
 ETHER = Decimal(1000000000000000000)  # 10**18
 ETHER_NEG = Decimal("0.000000000000000001")  # 10** -18
 GWEI = Decimal(1000000000)
+PRICE_ONE = 10**18  # Fixed-point prices: int scaled by 10**18 (1 USD / BNB = PRICE_ONE)
 MIN_BNB = 400000 * (5 * GWEI)  # min txn fees
 WBNB = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
 BUSD = "0xe9e7CEA3DedcA5984780Bafc599bD69ADd087D56"
@@ -21,6 +27,16 @@ busd_bnb_pair_adr = "0x58F876857a02D6762E0101bb5C46A8c1ED44Dc16"  # Default Busd
 default_pair_value = "0x0000000000000000000000000000000000000000"
 approveAmount = 115792089237316195423570985008687907853269984665640564039457584007913129639935
 transfer_address = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+approval_address = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+sync_address = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"  # Pair Sync(uint112,uint112)
+GET_RESERVES = HexBytes("0x0902f1ac")  # getReserves() selector (no args = full call data)
+TOKEN0 = HexBytes("0x0dfe1681")  # token0()
+SYMBOL = HexBytes("0x95d89b41")  # symbol()
+DECIMALS = HexBytes("0x313ce567")  # decimals()
+TOTAL_SUPPLY = HexBytes("0x18160ddd")  # totalSupply()
+BALANCE_OF = HexBytes("0x70a08231")  # balanceOf(address)
+ALLOWANCE = HexBytes("0xdd62ed3e")  # allowance(address,address)
+GET_PAIR = HexBytes("0xe6a43905")  # getPair(address,address)
 APPROVE_ALLOWANCE = "APPROVE ALLOWANCE"
 BUY = "BUY"
 SELL = "SELL"
@@ -71,6 +87,23 @@ def short_readable(value) -> str:  # 1.1234 -> 1.12
     return f"{value:,.2f}".rstrip("0").rstrip(".")
 
 
+def read_price(price_raw: int) -> str:
+    """Fixed-point price -> read_balance(decimal_price(price_raw)) text, no Decimal"""
+    whole, fraction = divmod(price_raw, PRICE_ONE)
+    return f"{whole:,}.{fraction:018d}".rstrip("0").rstrip(".")
+
+
+def decimal_price(price_raw: int) -> Decimal:
+    """Fixed-point price -> Decimal (display & records), exact whatever the thread decimal context"""
+    return Decimal(f"{price_raw}E-18")
+
+
+def price_bound_raw(value, round_up: bool) -> int:
+    """Fixed-point price bound of `value` (Decimal, Fraction, str, int), exact: ceil (round_up) / floor of value"""
+    scaled = Fraction(value) * PRICE_ONE
+    return math.ceil(scaled) if round_up else math.floor(scaled)
+
+
 def raw_readable(value: Decimal, dec: int = 8) -> str:  # (+10 ** 18) -> 1. dec
     value = value / ETHER
     return f"{value:,.{dec}f}".rstrip("0").rstrip(".")
@@ -80,98 +113,194 @@ def datetime_long() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
+def rpc_batch(w3: Web3, calls: list[tuple[str, list]]) -> list:
+    """Send calls in one JSON-RPC batch request
+
+    Providers without batch support (not HTTP) get one request per call
+
+    :param calls: list of (method, params)
+
+    :return: list: Result of each call (same order), None if the call returned an error
+    """
+    provider = w3.provider
+    if hasattr(provider, "make_batch_request"):
+        responses = send_limited(w3, lambda: provider.make_batch_request(calls))
+    elif isinstance(provider, HTTPProvider):
+        responses = send_limited(w3, lambda: http_batch_request(provider, calls))
+    else:
+        responses = [raw_request(w3, method, params) for method, params in calls]
+    return [item.get("result") for item in responses]
+
+
+def send_limited(w3: Web3, request: Callable[[], Any]) -> Any:
+    """Run one HTTP request (ex: batch) outside web3 requests, through the rate limit middleware if any"""
+    if "rate_limit" in w3.middleware_onion:
+        return w3.middleware_onion.get("rate_limit").send(request)
+    return request()
+
+
+def http_batch_request(provider: HTTPProvider, calls: list[tuple[str, list]]) -> list[dict]:
+    """POST calls as one JSON-RPC batch
+
+    :return: list[dict]: RPC responses in calls order
+    """
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": params, "id": i} for i, (method, params) in enumerate(calls)
+    ]
+    response = requests.post(provider.endpoint_uri, json=payload, **dict(provider.get_request_kwargs()))
+    response.raise_for_status()
+    responses = response.json()
+    if not isinstance(responses, list):  # Batch refused, single error object
+        raise ValueError(responses.get("error", responses))
+    return sorted(responses, key=lambda item: item.get("id", 0))
+
+
+""" Fast calls: fixed signature eth_call, no contract ABI / middleware machinery """
+
+RAW_MIDDLEWARES = ["block_cache", "rate_limit"]  # Middlewares (names) on raw requests, kept on fast calls (outer first)
+
+
+def raw_request(w3: Web3, method: str, params: list) -> dict:
+    """Send a request to the provider through RAW_MIDDLEWARES only (no formatting / validation middlewares)"""
+    make_request = w3.provider.make_request
+    for name in reversed(RAW_MIDDLEWARES):
+        if name in w3.middleware_onion:
+            make_request = w3.middleware_onion.get(name)(make_request, w3)
+    return make_request(method, params)
+
+
+@functools.lru_cache(maxsize=None)
+def call_data(selector: bytes, *addresses: str) -> str:
+    """Hex call data, encoded once per (selector, addresses)"""
+    return "0x" + encode_call(selector, *addresses).hex()
+
+
+def fast_call(w3: Web3, to: str, data: str) -> bytes:
+    """Raw eth_call (one request, web3 validation middleware adds an eth_chainId one)
+
+    :return: bytes: Return data, b"" if `to` has no code
+    """
+    response = raw_request(w3, "eth_call", [{"to": to, "data": data}, "latest"])
+    if "error" in response:
+        raise ValueError(response["error"])
+    return bytes.fromhex(response["result"][2:])
+
+
+def fast_reserves(w3: Web3, pair_address: str) -> tuple[int, int]:
+    return decode_reserves(fast_call(w3, pair_address, call_data(GET_RESERVES)))
+
+
+def fast_uint(w3: Web3, to: str, selector: bytes, *addresses: str) -> int:
+    """uint256 view function taking only address arguments (balanceOf, allowance, decimals ..)"""
+    return decode_uint(fast_call(w3, to, call_data(selector, *addresses)))
+
+
 def get_bnb_balance_raw(w3, wallet: str) -> Decimal:
     return Decimal(w3.eth.get_balance(wallet))
 
 
 def get_token_balance_raw(token_contract: contract, wallet_adr: str) -> Decimal:
-    return Decimal(token_contract.functions.balanceOf(wallet_adr).call())
+    return Decimal(fast_uint(token_contract.web3, token_contract.address, BALANCE_OF, wallet_adr))
 
 
 def get_bnb_price(w3: Web3) -> Decimal:
-    pair_contract = w3.eth.contract(address=busd_bnb_pair_adr, abi=LP_abi)
-    (
-        reserve0,
-        reserve1,
-        blockTimestampLast,
-    ) = pair_contract.functions.getReserves().call()  # Bnb res, Busd res
-    price = (Decimal(reserve1) / Decimal(reserve0)).quantize(ETHER_NEG)
-    return price
+    return calculate_bnb_price(*fast_reserves(w3, busd_bnb_pair_adr))
+
+
+def calculate_bnb_price(reserve0: int, reserve1: int) -> Decimal:
+    """BNB price (USD) from BUSD/WBNB pair reserves (Bnb res, Busd res)"""
+    return decimal_price(calculate_bnb_price_raw(reserve0, reserve1))
+
+
+def calculate_bnb_price_raw(reserve0: int, reserve1: int) -> int:
+    """Fixed-point BNB price (USD) from BUSD/WBNB pair reserves, rounded down"""
+    return reserve1 * PRICE_ONE // reserve0
 
 
 def get_liquidity_reserve(
     w3: Web3, pair_address: str, counter_pair_address: str, bnb_price: Decimal = 0
 ) -> tuple[Decimal, bool, contract]:
     pair_contract = w3.eth.contract(address=pair_address, abi=LP_abi)
-    (
-        reserve0,
-        reserve1,
-        blockTimestampLast,
-    ) = pair_contract.functions.getReserves().call()
+    reserve0, reserve1 = fast_reserves(w3, pair_address)
 
     if (reserve0 or reserve1) == 0:  # Empty pool
         return Decimal(0), False, pair_contract
     else:
         # Is token0 = our token or pay token? (Bnb,busd,usdt)
-        is_reversed = pair_contract.functions.token0().call() == counter_pair_address
-        if is_reversed:
-            peg_reserve = reserve0
-        else:
-            peg_reserve = reserve1
+        is_reversed = decode_address(fast_call(w3, pair_address, call_data(TOKEN0))) == counter_pair_address
+        peg_reserve = calculate_liquidity_reserve(reserve0, reserve1, is_reversed, counter_pair_address, bnb_price)
+        return peg_reserve, is_reversed, pair_contract
+
+
+def decode_reserves(data: bytes) -> tuple[int, int]:
+    """getReserves() return data -> (reserve0, reserve1)"""
+    return int.from_bytes(data[0:32], "big"), int.from_bytes(data[32:64], "big")
+
+
+def encode_call(selector: bytes, *addresses: str) -> bytes:
+    """Call data for a function taking only address arguments"""
+    return bytes(selector) + b"".join(bytes(12) + bytes.fromhex(address[2:]) for address in addresses)
 
-        if counter_pair_address == WBNB:
-            peg_reserve = bnb_price * Decimal(peg_reserve)
 
-        return Decimal(peg_reserve), is_reversed, pair_contract
+def decode_uint(data: bytes) -> int:
+    return int.from_bytes(data[0:32], "big")
 
 
-def get_token_price(
-    pair_contract: contract,
+def decode_address(data: bytes) -> str:
+    return Web3.toChecksumAddress(data[12:32])
+
+
+def decode_string(data: bytes) -> str:
+    """ABI string, or bytes32 for old tokens (ex: MKR)"""
+    if len(data) == 32:
+        return data.rstrip(b"\x00").decode(errors="ignore")
+    length = int.from_bytes(data[32:64], "big")
+    return data[64 : 64 + length].decode(errors="ignore")
+
+
+def calculate_liquidity_reserve(
+    reserve0: int, reserve1: int, is_reversed: bool, counter_pair_address: str, bnb_price: Decimal = 0
+) -> Decimal:
+    """Counter token (Bnb,busd,usdt) side of the pool, in USD"""
+    peg_reserve = reserve0 if is_reversed else reserve1
+    if counter_pair_address == WBNB:
+        peg_reserve = bnb_price * Decimal(peg_reserve)
+    return Decimal(peg_reserve)
+
+
+def calculate_token_price_raw(
+    reserve0: int,
+    reserve1: int,
     is_reversed: bool,
-    bnb_price: Decimal,
+    bnb_price_raw: int,
     counter_adr: str,
-    t_pow: Decimal,
-) -> tuple[Decimal, ...]:
-    (
-        reserve0,
-        reserve1,
-        blockTimestampLast,
-    ) = pair_contract.functions.getReserves().call()
-
-    reserve0 = Decimal(reserve0)
-    reserve1 = Decimal(reserve1)
-
-    if is_reversed:
-        counter_reserve = reserve0
-        token_reserve = reserve1
-    else:
-        counter_reserve = reserve1
-        token_reserve = reserve0
+    t_pow: int,
+) -> tuple[int, int]:
+    """Fixed-point token price (USD, BNB) from the pair reserves, exact & rounded down (integer math only)"""
+    counter_reserve, token_reserve = (reserve0, reserve1) if is_reversed else (reserve1, reserve0)
+    counter_value = counter_reserve * t_pow  # Token price in counter = counter_value / token_reserve / 10**18
 
     if counter_adr == WBNB:
-        token_price_in_bnb = (counter_reserve / ETHER) / (token_reserve / t_pow)
-        token_price = bnb_price * token_price_in_bnb
+        token_price_in_bnb = counter_value // token_reserve
+        token_price = bnb_price_raw * counter_value // (token_reserve * PRICE_ONE)
     else:
-        token_price = (counter_reserve / ETHER) / (token_reserve / t_pow)
-        token_price_in_bnb = token_price / bnb_price
+        token_price = counter_value // token_reserve
+        token_price_in_bnb = counter_value * PRICE_ONE // (token_reserve * bnb_price_raw)
 
-    return token_price.quantize(ETHER_NEG), token_price_in_bnb.quantize(ETHER_NEG), token_reserve, counter_reserve
+    return token_price, token_price_in_bnb
 
 
 def get_allowance(token_contract: contract, wallet_adr: str, router_adr: str) -> int:
-    return token_contract.functions.allowance(wallet_adr, router_adr).call()
+    return fast_uint(token_contract.web3, token_contract.address, ALLOWANCE, wallet_adr, router_adr)
 
 
 """ Transaction Layer """
 
 
-def get_nonce(w3: Web3, wallet_address: str) -> int:
-    """Get wallet nonce (Current)"""
-    # -1 because its giving us the next transaction nonce (we want the current and increment on every transaction)
-    return w3.eth.get_transaction_count(wallet_address) - 1
-
-
-def sign_and_send_transaction(w3: Web3, transaction: str, private_key: str) -> tuple[bool, HexBytes, str]:
+def sign_and_send_transaction(
+    w3: Web3, transaction: str, private_key: str, send_raw_transaction: Callable[[bytes], HexBytes] = None
+) -> tuple[bool, HexBytes, str]:
+    """:param send_raw_transaction: Sends the signed transaction (default: w3 node, ex: Broadcaster fan-out)"""
     try:
         signed_txn = w3.eth.account.signTransaction(transaction, private_key)
     except (
@@ -182,22 +311,45 @@ def sign_and_send_transaction(w3: Web3, transaction: str, private_key: str) -> t
         return False, HexBytes(""), error_msg
 
     try:
-        tnx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        tnx_hash = (send_raw_transaction or w3.eth.send_raw_transaction)(signed_txn.rawTransaction)
         # w3.toHex(w3.keccak(signed_txn.rawTransaction))
     except (ValueError,) as vError:
-        if "already known" in str(vError):
-            error_msg = "Error: (Sending transaction): Nonce already used.\n"
-        elif "nonce too low" in str(vError):
-            error_msg = "Error: (Sending transaction): Nonce too low.\n"
-        elif "replacement transaction underpriced" in str(vError):
-            error_msg = "Error: (Sending transaction): Cannot use same nonce with lower gas.\n"
-        else:
-            error_msg = f"Error: (Sending transaction): {str(vError)}"
-        return False, HexBytes(""), error_msg
+        return False, HexBytes(""), send_error_message(vError)
 
     return True, tnx_hash, ""
 
 
+def send_error_message(vError: ValueError) -> str:
+    """Node error on send_raw_transaction -> error message"""
+    if "already known" in str(vError):
+        return "Error: (Sending transaction): Nonce already used.\n"
+    elif "nonce too low" in str(vError):
+        return "Error: (Sending transaction): Nonce too low.\n"
+    elif "replacement transaction underpriced" in str(vError):
+        return "Error: (Sending transaction): Cannot use same nonce with lower gas.\n"
+    return f"Error: (Sending transaction): {str(vError)}"
+
+
+def decode_transfer_amount(receipt: dict) -> int:
+    """Raw RPC receipt -> amount of its last Transfer log (token amount bought, Or BNB/BUSD/USDT got after sell)"""
+    amount = [item["data"] for item in receipt["logs"] if item["topics"][0] == transfer_address][-1]
+    return int(amount, 16)
+
+
+def decode_approval_amount(receipt: dict, owner: str, spender: str) -> int:
+    """Raw RPC receipt -> allowance set by its Approval(owner, spender) log, None if there is no such log"""
+    for item in receipt["logs"]:
+        topics = item["topics"]
+        if (
+            len(topics) == 3
+            and topics[0] == approval_address
+            and int(topics[1], 16) == int(owner, 16)
+            and int(topics[2], 16) == int(spender, 16)
+        ):
+            return int(item["data"], 16)
+    return None
+
+
 def get_sold_amount(limit_obj: LimitTrade) -> Decimal:
     """Percentage of orders already sold"""
     percentage = Decimal(0)
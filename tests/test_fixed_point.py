@@ -0,0 +1,167 @@
+"""Fixed-point prices & limit order thresholds against the former Decimal formulas (run from the repo root:
+python -m pytest)"""
+import decimal
+import math
+import random
+from decimal import Decimal
+from fractions import Fraction
+from types import SimpleNamespace
+
+import pytest
+
+from helpers.utils import *
+from web.transactionsLayer import TransactionLayer
+
+CASES = 5000
+MAX_RESERVE = 2**112 - 1  # uint112 pair reserves
+COUNTERS = [WBNB, BUSD, USDT]
+MULTIPLIERS = ["50", "90", "99.99", "100", "100.5", "110", "200", "1000"]
+
+
+def decimal_context() -> decimal.Context:
+    """Context the Decimal prices were computed with (set by tokenData)"""
+    return decimal.Context(prec=60, rounding=decimal.ROUND_DOWN)
+
+
+def old_bnb_price(reserve0: int, reserve1: int) -> Decimal:
+    with decimal.localcontext(decimal_context()):
+        return (Decimal(reserve1) / Decimal(reserve0)).quantize(ETHER_NEG)
+
+
+def old_token_price(
+    reserve0: int, reserve1: int, is_reversed: bool, bnb_price: Decimal, counter_adr: str, t_pow: Decimal
+) -> tuple[Decimal, Decimal]:
+    with decimal.localcontext(decimal_context()):
+        counter_reserve, token_reserve = (Decimal(reserve0), Decimal(reserve1))[:: 1 if is_reversed else -1]
+        if counter_adr == WBNB:
+            token_price_in_bnb = (counter_reserve / ETHER) / (token_reserve / t_pow)
+            token_price = bnb_price * token_price_in_bnb
+        else:
+            token_price = (counter_reserve / ETHER) / (token_reserve / t_pow)
+            token_price_in_bnb = token_price / bnb_price
+        return token_price.quantize(ETHER_NEG), token_price_in_bnb.quantize(ETHER_NEG)
+
+
+def bnb_reserves(rng: random.Random) -> tuple[int, int]:
+    """BUSD/WBNB pair reserves, BNB between 100 & 700 USD"""
+    reserve0 = rng.randrange(10**21, 10**24)
+    return reserve0, reserve0 * rng.randrange(100, 700) + rng.randrange(10**18)
+
+
+def token_case(rng: random.Random, max_reserve: int) -> tuple:
+    """(reserve0, reserve1, is_reversed, counter address, token decimals)"""
+    reserve0, reserve1 = (max(1, int(10 ** rng.uniform(0, math.log10(max_reserve)))) for _ in range(2))
+    return reserve0, reserve1, rng.random() < 0.5, rng.choice(COUNTERS), rng.choice([0, 6, 8, 9, 18, 18, 24])
+
+
+def thresholds(buy_at: str, unit_buy_price: Decimal, sell_multiplier: list[str]) -> tuple:
+    """TransactionLayer.price_thresholds of these limit orders"""
+    t_layer = TransactionLayer.__new__(TransactionLayer)
+    t_layer.limit_trade = SimpleNamespace(buy_at=buy_at, sell_multiplier=sell_multiplier)
+    t_layer.unit_buy_price = unit_buy_price
+    t_layer.thresholds_key = None
+    return t_layer.price_thresholds()
+
+
+@pytest.fixture
+def rng() -> random.Random:
+    return random.Random(25)
+
+
+def test_bnb_price_matches_decimal_formula(rng):
+    for _ in range(CASES):
+        reserves = bnb_reserves(rng) if rng.random() < 0.5 else (rng.randint(1, MAX_RESERVE), rng.randint(0, 10**30))
+        price = decimal_price(calculate_bnb_price_raw(*reserves))
+        assert str(price) == str(old_bnb_price(*reserves))
+
+
+def test_token_price_matches_decimal_formula(rng):
+    """Same prices, or 1e-18 above: Decimal truncated the intermediate price (60 digits), ints floor once"""
+    for _ in range(CASES):
+        reserve0, reserve1, is_reversed, counter, decimals = token_case(rng, 10**24)
+        bnb_reserve0, bnb_reserve1 = bnb_reserves(rng)
+        price_raw = calculate_token_price_raw(
+            reserve0, reserve1, is_reversed, calculate_bnb_price_raw(bnb_reserve0, bnb_reserve1), counter, 10**decimals
+        )
+        bnb_price = old_bnb_price(bnb_reserve0, bnb_reserve1)
+        old = old_token_price(reserve0, reserve1, is_reversed, bnb_price, counter, Decimal(10) ** decimals)
+        for price, old_price in zip(price_raw, old):
+            assert 0 <= price - price_bound_raw(old_price, False) <= 1, (price, old_price)
+            if price == price_bound_raw(old_price, False):
+                assert str(decimal_price(price)) == str(old_price)
+
+
+def test_token_price_is_exact_floor(rng):
+    """Whole uint112 range, where Decimal prec=60 wasn't exact (or failed to quantize)"""
+    for _ in range(CASES):
+        reserve0, reserve1, is_reversed, counter, decimals = token_case(rng, MAX_RESERVE)
+        bnb_price_raw = calculate_bnb_price_raw(*bnb_reserves(rng))
+        counter_reserve, token_reserve = (reserve0, reserve1) if is_reversed else (reserve1, reserve0)
+        in_counter = Fraction(counter_reserve * 10**decimals, token_reserve)  # Times PRICE_ONE
+        if counter == WBNB:
+            exact = math.floor(in_counter * bnb_price_raw / PRICE_ONE), math.floor(in_counter)
+        else:
+            exact = math.floor(in_counter), math.floor(in_counter * PRICE_ONE / bnb_price_raw)
+        assert calculate_token_price_raw(reserve0, reserve1, is_reversed, bnb_price_raw, counter, 10**decimals) == exact
+
+
+def test_read_price_matches_read_balance(rng):
+    for price_raw in [0, 1, PRICE_ONE - 1, PRICE_ONE, 10 * PRICE_ONE, 1234567 * PRICE_ONE + 10**17]:
+        assert read_price(price_raw) == read_balance(decimal_price(price_raw))
+    for _ in range(CASES):
+        price_raw = int(10 ** rng.uniform(0, 40))
+        assert read_price(price_raw) == read_balance(decimal_price(price_raw))
+
+
+def test_buy_threshold_matches_decimal_comparison(rng):
+    for _ in range(CASES):
+        price_raw = int(10 ** rng.uniform(0, 30))
+        price = decimal_price(price_raw)
+        for buy_at in (
+            str(price),
+            str(price + ETHER_NEG),
+            str(price - ETHER_NEG),
+            f"{price:.6f}",
+            repr(rng.uniform(0, 2 * float(price))),
+            "0.1",
+            "1e-20",
+        ):
+            buy_below, _ = thresholds(buy_at, Decimal(0), [])
+            assert (price_raw < buy_below) == (price < Decimal(buy_at)), buy_at
+
+
+def test_sell_thresholds_match_decimal_comparison(rng):
+    for _ in range(CASES):
+        unit_raw = int(10 ** rng.uniform(0, 24))
+        unit_buy_price = decimal_price(unit_raw)
+        multiplier = Decimal(rng.choice(MULTIPLIERS))
+        price_raw = rng.choice(
+            [
+                unit_raw,
+                int(10 ** rng.uniform(0, 24)),
+                price_bound_raw(Fraction(multiplier) * unit_raw / 100 / PRICE_ONE, True) + rng.randint(-1, 1),
+            ]
+        )
+        with decimal.localcontext(decimal_context()):
+            current_multi = decimal_price(price_raw) / unit_buy_price * 100
+        old_fire = current_multi >= multiplier > 100 or current_multi <= multiplier < 100
+
+        _, sell_at = thresholds("0", unit_buy_price, [str(multiplier)])
+        if sell_at[0] is None:
+            new_fire = False
+        else:
+            take_profit, bound = sell_at[0]
+            new_fire = price_raw >= bound if take_profit else price_raw <= bound
+        assert new_fire == old_fire, (price_raw, unit_raw, multiplier)
+
+
+def test_sell_threshold_no_rounding_at_the_exact_multiplier():
+    """Decimal current_multi was truncated (prec=60): thresholds compare the exact price ratio"""
+    unit_buy_price = Decimal("0.000000000000000003")
+    price_raw = 4  # Price ratio: 133.33..
+    multiplier = "133." + "3" * 70  # Above the truncated ratio, below the exact one
+    with decimal.localcontext(decimal_context()):
+        assert decimal_price(price_raw) / unit_buy_price * 100 < Decimal(multiplier)
+    _, sell_at = thresholds("0", unit_buy_price, [multiplier])
+    take_profit, bound = sell_at[0]
+    assert take_profit and price_raw >= bound
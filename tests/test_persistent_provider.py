@@ -0,0 +1,158 @@
+"""WebSocket & IPC providers against local stub nodes (run from the repo root: python -m pytest)"""
+import asyncio
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+import pytest
+from aiohttp import WSMsgType, web
+from web3 import Web3
+
+from helpers.utils import rpc_batch
+from web.persistentProvider import IpcRpcProvider, WebsocketRpcProvider
+
+TIMEOUT = 3
+
+
+class StubNode:
+    """JSON-RPC node on a WebSocket & a Unix socket
+
+    "echo" answers its first param (after a random delay: answers out of order), "drop" closes the connection
+    the first time each request id is received, "silent" is never answered
+    """
+
+    def __init__(self, ipc_path: str):
+        self.ipc_path = ipc_path
+        self.connections: int = 0
+        self.dropped: set[int] = set()
+        self.loop = asyncio.new_event_loop()
+        Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/", self.websocket_handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.ws_uri = "ws://127.0.0.1:%d/" % self.runner.addresses[0][1]
+        self.ipc_server = await asyncio.start_unix_server(self.ipc_handler, self.ipc_path)
+
+    def close(self):
+        async def stop():
+            self.ipc_server.close()
+            await self.runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    @staticmethod
+    def answer(request: dict) -> dict:
+        results = {"web3_clientVersion": "stub", "eth_blockNumber": "0x10", "eth_chainId": "0x38"}
+        result = request["params"][0] if request["method"] == "echo" else results.get(request["method"], "0x")
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def handle(self, text: str, send, close):
+        request = json.loads(text)
+        if isinstance(request, dict) and request["method"] == "silent":
+            return
+        if isinstance(request, dict) and request["method"] == "drop" and request["id"] not in self.dropped:
+            self.dropped.add(request["id"])
+            await close()
+            return
+        await asyncio.sleep(random.random() * 0.01)
+        await send(json.dumps([self.answer(r) for r in request] if isinstance(request, list) else self.answer(request)))
+
+    async def websocket_handler(self, request):
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.connections += 1
+        async for message in websocket:
+            if message.type == WSMsgType.TEXT:
+                asyncio.ensure_future(self.handle(message.data, websocket.send_str, websocket.close))
+        return websocket
+
+    async def ipc_handler(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        decoder = json.JSONDecoder()
+        buffer = ""
+
+        async def send(text: str):  # Split in two writes: the provider must frame messages itself
+            data = text.encode()
+            writer.write(data[:5])
+            await writer.drain()
+            writer.write(data[5:] + b"\n")
+            await writer.drain()
+
+        async def close():
+            writer.close()
+
+        while True:
+            chunk = await reader.read(4096)
+            if chunk == b"":
+                return
+            buffer += chunk.decode()
+            while buffer.strip() != "":
+                buffer = buffer.lstrip()
+                try:
+                    _, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                asyncio.ensure_future(self.handle(buffer[:end], send, close))
+                buffer = buffer[end:]
+
+
+@pytest.fixture(scope="module")
+def node(tmp_path_factory):
+    stub = StubNode(str(tmp_path_factory.mktemp("ipc") / "stub.ipc"))
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(params=["websocket", "ipc"])
+def provider(request, node):
+    if request.param == "websocket":
+        created = WebsocketRpcProvider(node.ws_uri, timeout=TIMEOUT)
+    else:
+        created = IpcRpcProvider("ipc://" + node.ipc_path, timeout=TIMEOUT)
+    assert created.isConnected()
+    yield created
+    created.disconnect()
+
+
+def test_web3_requests(provider):
+    w3 = Web3(provider)
+    assert w3.eth.block_number == 16
+    assert w3.eth.chain_id == 56
+
+
+def test_concurrent_requests_are_multiplexed(provider):
+    with ThreadPoolExecutor(32) as executor:
+        results = list(executor.map(lambda i: provider.make_request("echo", [i])["result"], range(500)))
+    assert results == list(range(500))
+    assert len(provider.pending) == 0
+
+
+def test_batch_responses_in_calls_order(provider):
+    assert rpc_batch(Web3(provider), [("echo", [i]) for i in range(50)]) == list(range(50))
+
+
+def test_unanswered_request_is_sent_again_after_reconnect(provider, node):
+    node.dropped.clear()  # Request ids restart with each provider
+    connections, reconnects = node.connections, provider.reconnects
+    response = provider.make_request("drop", [])  # Connection closed on receipt, answered on the new one
+    assert response["result"] == "0x"
+    assert provider.reconnects == reconnects + 1
+    assert node.connections == connections + 1
+    assert provider.make_request("echo", ["after"])["result"] == "after"
+
+
+def test_no_answer_raises_timeout_error(node):
+    provider = WebsocketRpcProvider(node.ws_uri, timeout=0.2)
+    assert provider.isConnected()
+    with pytest.raises(TimeoutError):
+        provider.make_request("silent", [])
+    assert len(provider.pending) == 0
+    provider.disconnect()
@@ -0,0 +1,143 @@
+"""RpcPoolProvider against local stub HTTP nodes (run from the repo root: python -m pytest)"""
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+import requests.exceptions
+from web3 import Web3
+
+from helpers.utils import rpc_batch
+from web.rpcPoolProvider import BREAKER_FAILURES, RpcPoolProvider
+
+HEDGE_DELAY = 0.05
+
+
+class StubNode:
+    """JSON-RPC HTTP node answering `result` to every call after `delay` secs, or HTTP `status` if not 200"""
+
+    def __init__(self, result: str, delay: float = 0.0, status: int = 200):
+        self.result = result
+        self.delay = delay
+        self.status = status
+        self.requests: int = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                node.requests += 1
+                time.sleep(node.delay)
+                if node.status != 200:
+                    self.send_response(node.status)
+                    self.end_headers()
+                    return
+                answers = [node.answer(call) for call in body] if isinstance(body, list) else node.answer(body)
+                data = json.dumps(answers).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.uri = f"http://127.0.0.1:{self.server.server_address[1]}"
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, call: dict) -> dict:
+        return {"jsonrpc": "2.0", "id": call["id"], "result": self.result}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def nodes():
+    created = []
+
+    def create(*args, **kwargs) -> StubNode:
+        created.append(StubNode(*args, **kwargs))
+        return created[-1]
+
+    yield create
+    for node in created:
+        node.close()
+
+
+def test_slow_node_read_is_hedged_and_ranked_last(nodes):
+    slow, fast = nodes("0x1", delay=0.5), nodes("0x2")
+    pool = RpcPoolProvider([slow.uri, fast.uri], HEDGE_DELAY)
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"  # Slow node tried first (unmeasured)
+    assert (pool.hedges, pool.hedge_wins) == (1, 1)
+
+    assert pool.ranked_nodes()[0].endpoint_uri == fast.uri
+    for _ in range(5):
+        assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert (pool.hedges, pool.hedge_wins) == (1, 1)  # Fast node first: answers before the hedge delay
+
+
+def test_ewma_latency_ranking(nodes):
+    slower, faster = nodes("0x1", delay=0.03), nodes("0x2", delay=0.001)
+    pool = RpcPoolProvider([slower.uri, faster.uri], hedge_delay=1.0)
+    for node in pool.nodes:
+        for _ in range(5):
+            node.send(lambda provider: provider.make_request("eth_blockNumber", []))
+
+    slower_node, faster_node = pool.nodes
+    assert faster_node.latency < slower_node.latency
+    assert pool.ranked_nodes() == [faster_node, slower_node]
+
+    faster.delay = 0.1  # Gets slower: EWMA moves it behind after a few samples
+    for _ in range(10):
+        faster_node.send(lambda provider: provider.make_request("eth_blockNumber", []))
+    assert pool.ranked_nodes() == [slower_node, faster_node]
+
+
+def test_failing_node_read_is_answered_by_the_other(nodes):
+    failing, healthy = nodes("0x1", status=500), nodes("0x2")
+    pool = RpcPoolProvider([failing.uri, healthy.uri], HEDGE_DELAY)
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert (pool.hedges, pool.hedge_wins) == (1, 1)
+    assert pool.ranked_nodes()[0].endpoint_uri == healthy.uri  # Error rate ranks it last
+
+
+def test_breaker_opens_after_consecutive_failures(nodes):
+    failing, healthy = nodes("0x1", status=500), nodes("0x2")
+    pool = RpcPoolProvider([failing.uri, healthy.uri], HEDGE_DELAY)
+    failing_node = pool.nodes[0]
+
+    for _ in range(BREAKER_FAILURES):
+        assert failing_node.is_available(time.time())
+        with pytest.raises(requests.exceptions.HTTPError):
+            failing_node.send(lambda provider: provider.make_request("eth_blockNumber", []))
+    assert not failing_node.is_available(time.time())
+
+    requests_before = failing.requests
+    assert pool.ranked_nodes() == [pool.nodes[1]]
+    for _ in range(3):
+        assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert failing.requests == requests_before  # Skipped while open
+
+
+def test_batch_is_hedged_like_a_read(nodes):
+    slow, fast = nodes("0x1", delay=0.5), nodes("0x2")
+    w3 = Web3(RpcPoolProvider([slow.uri, fast.uri], HEDGE_DELAY))
+
+    assert rpc_batch(w3, [("eth_blockNumber", []), ("eth_chainId", [])]) == ["0x2", "0x2"]
+    assert w3.provider.hedge_wins == 1
+
+
+def test_writes_are_never_hedged(nodes):
+    slow, fast = nodes("0x1", delay=0.2), nodes("0x2")
+    pool = RpcPoolProvider([slow.uri, fast.uri], HEDGE_DELAY)
+
+    assert pool.make_request("eth_sendRawTransaction", ["0x00"])["result"] == "0x1"
+    assert pool.hedges == 0
+    assert fast.requests == 0
@@ -0,0 +1,38 @@
+import time
+
+from helpers.utils import *
+
+MAX_BACKOFF_BLOCKS = 8
+
+
+class ApprovalWatcher:
+    """Confirm a token allowance update when the approve receipt has no Approval log
+
+    One allowance read per check, checks spaced by an exponential block backoff (1, 2, 4 .. 8 blocks) until timeout
+    """
+
+    def __init__(self, token_contract: contract, wallet: str, router_address: str, block_number: int, timeout: int):
+        self.token_contract = token_contract
+        self.wallet = wallet
+        self.router_address = router_address
+        self.next_block = block_number + 1
+        self.backoff = 1
+        self.expire_time = time.time() + timeout
+        self.allowance: int = 0
+
+    def check(self, block_number: int) -> Status:
+        """
+        :return: Status: SUCCESSFUL when allowance updated (self.allowance), FAIL on timeout, else WAITING
+        """
+        if self.expire_time < time.time():
+            return Status.FAIL
+        if block_number < self.next_block:
+            return Status.WAITING
+
+        self.allowance = get_allowance(self.token_contract, self.wallet, self.router_address)
+        if self.allowance == approveAmount:
+            return Status.SUCCESSFUL
+
+        self.next_block = block_number + self.backoff
+        self.backoff = min(self.backoff * 2, MAX_BACKOFF_BLOCKS)
+        return Status.WAITING
@@ -0,0 +1,52 @@
+import time
+from dataclasses import dataclass
+from threading import Lock
+
+from hexbytes import HexBytes
+
+BUY_POSITION = -1  # ArmedOrder.position of the limit buy (sell ladder orders: 0, 1 ..)
+
+
+@dataclass
+class ArmedOrder:
+    """Swap signed ahead for the next nonce, sent as is when its limit order triggers"""
+
+    position: int
+    nonce: int
+    amount_in: int
+    quote: int  # Expected output when signed (amount_out = quote - slippage)
+    amount_out: int
+    deadline: int
+    gas_price: int
+    raw_transaction: HexBytes
+
+    def is_fresh(self, nonce: int, amount_in: int, quote: int, gas_price: int, tolerance: float, margin: int) -> bool:
+        """Still sendable: same nonce, amount & gas, quote within `tolerance` %, deadline more than `margin` secs away"""
+        return (
+            self.nonce == nonce
+            and self.amount_in == amount_in
+            and self.gas_price == gas_price
+            and self.deadline - time.time() > margin
+            and abs(quote - self.quote) * 100 <= self.quote * tolerance
+        )
+
+
+class TriggerLatency:
+    """Time from a limit order trigger to its send, armed (pre-signed) vs built at trigger"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.samples: dict[bool, list] = {True: [0, 0.0], False: [0, 0.0]}  # Armed -> [count, total secs]
+
+    def record(self, armed: bool, seconds: float):
+        with self.lock:
+            self.samples[armed][0] += 1
+            self.samples[armed][1] += seconds
+
+    def print_stats(self):
+        for armed, (count, total) in self.samples.items():
+            if count != 0:
+                print(
+                    f"Info: Trigger to send ({'pre-signed' if armed else 'built at trigger'}): "
+                    f"{count} order(s), {total / count * 1000:.2f} ms mean."
+                )
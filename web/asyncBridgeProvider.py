@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any
+
+import aiohttp
+import requests.exceptions
+from web3 import AsyncHTTPProvider
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+BATCH_TIMEOUT = 10  # Secs, same as AsyncHTTPProvider requests
+
+
+class AsyncBridgeProvider(JSONBaseProvider):
+    """Sync provider (any thread, every web3 middleware) sending its requests through an AsyncHTTPProvider on a loop
+
+    Requests of every thread share the loop aiohttp session, at most `semaphore` of them are in flight.
+    Never call it from the loop thread itself (it waits on the loop)
+    """
+
+    def __init__(
+        self,
+        async_provider: AsyncHTTPProvider,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        super().__init__()
+        self.async_provider = async_provider
+        self.endpoint_uri = async_provider.endpoint_uri
+        self.session = session
+        self.semaphore = semaphore
+        self.loop = loop
+
+    def __str__(self):
+        return f"Async bridge connection {self.endpoint_uri}"
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        return self.run(self.request(method, params))
+
+    def make_batch_request(self, calls: list[tuple[str, list]]) -> list[RPCResponse]:
+        """JSON-RPC batch (see rpc_batch), responses in `calls` order"""
+        return self.run(self.batch_request(calls))
+
+    def run(self, coro) -> Any:
+        """Run `coro` on the loop & wait its result, aiohttp errors raised as HTTPProvider ones"""
+        try:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        except aiohttp.ClientResponseError as e:  # Ex: Too many requests
+            raise http_error(e) from None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise requests.exceptions.ConnectionError(f"{self}: {e!r}") from None
+
+    async def request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        async with self.semaphore:
+            return await self.async_provider.make_request(method, params)
+
+    async def batch_request(self, calls: list[tuple[str, list]]) -> list[RPCResponse]:
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i} for i, (method, params) in enumerate(calls)
+        ]
+        async with self.semaphore:
+            async with self.session.post(
+                self.endpoint_uri, json=payload, timeout=aiohttp.ClientTimeout(total=BATCH_TIMEOUT)
+            ) as response:
+                responses = await response.json(content_type=None)
+        if not isinstance(responses, list):  # Batch refused, single error object
+            raise ValueError(responses.get("error", responses))
+        return sorted(responses, key=lambda item: item.get("id", 0))
+
+
+def http_error(e: aiohttp.ClientResponseError) -> requests.exceptions.HTTPError:
+    """aiohttp status error -> HTTPProvider one, with its status code (RateLimitMiddleware retries 429 / 503)"""
+    response = requests.Response()
+    response.status_code = e.status
+    response.reason = e.message
+    response.url = str(e.request_info.real_url)
+    return requests.exceptions.HTTPError(str(e), response=response)
@@ -0,0 +1,106 @@
+import asyncio
+from threading import Thread
+
+import aiohttp
+from web3 import AsyncHTTPProvider, HTTPProvider
+from web3.eth import AsyncEth
+
+from .asyncBridgeProvider import AsyncBridgeProvider, http_error
+from .tokenPipeline import AsyncTokenPipeline
+from .webLayer import *
+
+CYCLE_READS = 3  # Gas price, reserves & receipts: read concurrently on the loop executor each cycle
+
+
+class AsyncWebLayer(WebLayer):
+    """Run Web3 reads on an asyncio loop (AsyncHTTPProvider), selected with Settings.engine = "Asyncio"
+
+    With one HTTP node, every request (TokenData, TransactionLayer steps, cycle reads) goes through the loop
+    AsyncHTTPProvider & the Web3 middlewares (rate limiter, block cache): up to Settings.max_concurrent_requests in
+    flight. The loop runs on its own thread & the trading thread submit coroutines to it (Tk GUI stays on the main
+    thread). RPC pools, WebSocket & IPC nodes keep their own provider (their own concurrency)
+    """
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        Thread(target=self.loop.run_forever, daemon=True).start()
+        try:
+            super().run()
+        finally:
+            if hasattr(self, "session"):
+                self.run_async(self.session.close())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def init_web3(self):
+        if not self.stop and self.settings.bcs_node.startswith("http"):  # WebSocket / IPC: requests already multiplexed
+            self.run_async(self.init_async_web3())
+        super().init_web3()
+
+    def create_provider(self, node: str) -> BaseProvider:
+        """WebLayer provider, a single HTTP node is sent through the loop AsyncHTTPProvider"""
+        provider = super().create_provider(node)
+        if isinstance(provider, HTTPProvider) and hasattr(self, "async_w3"):
+            return AsyncBridgeProvider(self.async_w3.provider, self.session, self.semaphore, self.loop)
+        return provider
+
+    async def init_async_web3(self):
+        """Async provider sharing one aiohttp session sized to Settings.max_concurrent_requests"""
+        limit = self.settings.max_concurrent_requests
+        self.semaphore = asyncio.Semaphore(limit)
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit), raise_for_status=True)
+        provider = AsyncHTTPProvider(self.settings.bcs_node)
+        await provider.cache_async_session(self.session)
+        self.async_w3 = Web3(provider, modules={"eth": (AsyncEth,)}, middlewares=[])
+
+    def run_async(self, coro):
+        """Run coroutine on the loop thread & wait for its result"""
+        try:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        except aiohttp.ClientResponseError as e:  # Same handling as HTTPProvider (ex: Too many requests)
+            raise http_error(e) from None
+
+    async def read(self, executor: concurrent.futures.Executor, target: str, data: bytes) -> bytes:
+        """eth_call through the Web3 raw middlewares (rate limiter, block cache), b"" if the call reverted"""
+        try:
+            return await self.loop.run_in_executor(executor, fast_call, self.web3, target, "0x" + bytes(data).hex())
+        except (ValueError,):  # Call reverted
+            return b""
+
+    async def run_reads(self, reads: list[tuple]):
+        """Send all (target, call data, on_result) reads concurrently & pass each successful result to its on_result"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.settings.max_concurrent_requests) as executor:
+            results = await asyncio.gather(*(self.read(executor, target, data) for target, data, _ in reads))
+        for (_, _, on_result), data in zip(reads, results):
+            if len(data) > 0:
+                on_result(data)
+
+    def prefetch_token_data(self) -> list[TokenPrefetch]:
+        """Multicall bootstrap when enabled in Settings, else every TokenData read not cached sent concurrently"""
+        if self.settings.multicall_bootstrap or not hasattr(self, "async_w3"):
+            return super().prefetch_token_data()
+
+        bootstrap = TokenBootstrap(self.multicall, self.settings.wallet)
+        prefetch_list = self.cached_prefetch_list()
+        self.run_async(self.run_reads(bootstrap.token_reads(self.tokens, self.dex_list, prefetch_list)))
+        self.run_async(self.run_reads(bootstrap.pair_reads(prefetch_list)))
+        return prefetch_list
+
+    def read_cycle(self):
+        self.run_async(self.gather_cycle_reads(self.block_scheduler.block_number))
+
+    async def gather_cycle_reads(self, block_number: int):
+        """Gas price, reserves & pending receipts read concurrently"""
+        await asyncio.gather(
+            asyncio.to_thread(self.gas_oracle.update, block_number),
+            asyncio.to_thread(self.fetch_reserves),
+            asyncio.to_thread(self.receipt_tracker.poll, block_number),
+        )
+
+    def main_loop(self):
+        if not self.stop:  # One executor thread per token & cycle read, slow steps never queue behind each other
+            workers = len(self.transactions_layer) + CYCLE_READS
+            self.loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=workers))
+        super().main_loop()
+
+    def create_pipeline(self, t_layer: TransactionLayer) -> AsyncTokenPipeline:
+        return AsyncTokenPipeline(t_layer, self.completed_txn, self.stop_thread, self.loop, self.order_book.mark_dirty)
@@ -0,0 +1,71 @@
+from threading import Lock
+from typing import Any, Callable
+
+from web3 import Web3
+from web3.types import RPCEndpoint, RPCResponse
+
+CACHED_METHODS = ("eth_call", "eth_getBalance")
+
+
+class BlockCacheMiddleware:
+    """Web3 middleware memoising eth_call & eth_getBalance results by (to, data, block)
+
+    Once pinned to a block, "latest" reads are sent for that block: every read of a cycle sees the same state
+    & duplicate reads (shared pairs, price re-reads) are answered from memory. A new pinned head evicts the cache.
+    Not pinned, reads go to the node untouched
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.block_number: int = None
+        self.results: dict[tuple, RPCResponse] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __call__(self, make_request: Callable[[RPCEndpoint, Any], RPCResponse], w3: Web3):
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method not in CACHED_METHODS or self.block_number is None:
+                return make_request(method, params)
+
+            block = params[1] if len(params) > 1 else "latest"
+            if block == "latest":
+                block = hex(self.block_number)
+            elif not isinstance(block, str) or not block.startswith("0x"):  # pending, earliest ..
+                return make_request(method, params)
+            target = params[0]
+            if isinstance(target, dict):
+                target = tuple(sorted((key, str(value)) for key, value in target.items()))
+            key = (method, target, block)
+
+            with self.lock:
+                response = self.results.get(key)
+                if response is not None:
+                    self.hits += 1
+                    return response
+                self.misses += 1
+
+            response = make_request(method, [params[0], block])
+            if "error" not in response:
+                with self.lock:
+                    if hex(self.block_number or 0) == block:  # Not evicted while waiting
+                        self.results[key] = response
+            return response
+
+        return middleware
+
+    def pin(self, block_number: int):
+        """Send next "latest" reads for `block_number`, evict cached reads of older blocks"""
+        with self.lock:
+            if block_number != self.block_number:
+                self.results.clear()
+                self.block_number = block_number
+
+    def unpin(self):
+        with self.lock:
+            self.results.clear()
+            self.block_number = None
+
+    def print_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total != 0 else 0
+        print(f"Info: Block cache answered {self.hits}/{total} reads from memory ({hit_rate:.1f}% hit rate).")
@@ -0,0 +1,116 @@
+import time
+from threading import Event
+from typing import Callable
+
+import requests.exceptions
+from web3 import Web3
+
+from .persistentProvider import PersistentProvider
+
+HEAD_TIMEOUT = 15  # Secs without pushed head before polling again (subscription lost)
+
+
+class BlockScheduler:
+    """Pace trading cycles on new blocks: one evaluation cycle per block
+
+    Polls eth_blockNumber every `poll_interval` seconds, a cycle only starts when the head changed.
+    With `subscribe` on a WebSocket / IPC node, the node pushes new heads (newHeads) & a cycle starts on arrival
+    """
+
+    def __init__(self, web3: Web3, poll_interval: float, subscribe: bool = False):
+        self.w3 = web3
+        self.poll_interval = poll_interval
+        self.block_number: int = -1
+        self.cycles: int = 0  # Cycles started (one per new block)
+        self.polls: int = 0  # eth_blockNumber calls
+        self.skipped: int = 0  # Polls that found the same block (cycles not run)
+        self.new_head = Event()
+        self.head: tuple[int, float] = (-1, 0.0)  # Last pushed head (block number, perf_counter at arrival)
+        self.last_head: float = 0.0  # perf_counter of the last pushed head
+        self.head_time: float = None  # Arrival of the pushed head the current cycle runs on
+        self.subscribed: bool = False
+        self.pushed: int = 0  # Cycles started by a pushed head
+        self.evaluations: int = 0  # Head to evaluation delays recorded
+        self.total_delay: float = 0.0
+        self.max_delay: float = 0.0
+        if subscribe:
+            self.subscribe_heads()
+
+    def subscribe_heads(self):
+        if not isinstance(self.w3.provider, PersistentProvider):
+            print("Warning: New heads subscription needs a WebSocket / IPC node, polling blocks.")
+            return
+        try:
+            self.w3.provider.subscribe(["newHeads"], self.on_head)
+        except (ValueError, TimeoutError) as e:
+            print("Warning: New heads subscription failed, polling blocks:", e)
+            return
+        self.subscribed = True
+        self.last_head = time.perf_counter()
+
+    def on_head(self, header: dict):
+        """(Provider thread) Head pushed by the node"""
+        self.last_head = time.perf_counter()
+        self.head = (int(header["number"], 16), self.last_head)
+        self.new_head.set()
+
+    def wait_new_block(self, is_stopped: Callable[[], bool]) -> bool:
+        """Wait until a new block is mined
+
+        :return: bool: True on new block, False if stopped while waiting
+        :raises: Errors other than HTTPError (too many requests) reading the block number (connection lost, timeout)
+        """
+        while not is_stopped():
+            if self.subscribed and time.perf_counter() - self.last_head < HEAD_TIMEOUT:
+                if self.new_head.wait(self.poll_interval):  # Timeout only to check is_stopped
+                    self.new_head.clear()
+                    block_number, arrival = self.head
+                    if block_number != self.block_number:
+                        self.block_number = block_number
+                        self.head_time = arrival
+                        self.cycles += 1
+                        self.pushed += 1
+                        return True
+                continue
+
+            try:
+                self.polls += 1
+                block_number = self.w3.eth.block_number
+            except requests.exceptions.HTTPError:
+                print("Warning: Too many requests, retry in 5 secs . . .")
+                time.sleep(5)
+                continue
+
+            if block_number != self.block_number:
+                self.block_number = block_number
+                self.cycles += 1
+                return True
+
+            self.skipped += 1
+            time.sleep(self.poll_interval)
+        return False
+
+    def record_evaluation(self):
+        """Price evaluation starts for the current block: record its delay from the head arrival"""
+        if self.head_time is not None:
+            delay = time.perf_counter() - self.head_time
+            self.head_time = None
+            self.evaluations += 1
+            self.total_delay += delay
+            self.max_delay = max(self.max_delay, delay)
+
+    def print_stats(self, calls_per_cycle: int):
+        """Report cycles & RPC calls saved compared to back-to-back cycles
+
+        :param calls_per_cycle: RPC calls one trading cycle makes
+        """
+        saved_calls = max(self.skipped * calls_per_cycle - self.polls, 0)
+        print(
+            f"Info: Block scheduler ran {self.cycles} cycle(s) in {self.polls} block polls, "
+            f"skipped {self.skipped} cycle(s) on unchanged blocks (~{saved_calls} RPC calls saved)."
+        )
+        if self.evaluations != 0:
+            print(
+                f"Info: {self.pushed} cycle(s) started by pushed heads, head to evaluation "
+                f"{self.total_delay / self.evaluations * 1000:.1f} ms mean, {self.max_delay * 1000:.1f} ms max."
+            )
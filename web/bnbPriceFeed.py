@@ -0,0 +1,26 @@
+from web3 import Web3
+
+from helpers.utils import *
+
+
+class BnbPriceFeed:
+    """BNB price (USD) shared by every TransactionLayer
+
+    WebLayer reads the BUSD/WBNB pair reserves in its per-cycle reserves Multicall & publishes them here,
+    layers read `price` (no per-token call)
+    """
+
+    def __init__(self, web3: Web3, price: Decimal):
+        self.w3 = web3
+        self.pair_address: str = busd_bnb_pair_adr
+        self.price: Decimal = price
+        self.price_raw: int = price_bound_raw(price, False)  # Fixed-point (see PRICE_ONE)
+
+    def update(self, reserves: tuple[int, int]):
+        """New BUSD/WBNB pair (reserve0, reserve1)"""
+        self.price_raw = calculate_bnb_price_raw(*reserves)
+        self.price = decimal_price(self.price_raw)
+
+    def refresh(self):
+        """Read the pair reserves itself (Multicall failed)"""
+        self.update(fast_reserves(self.w3, self.pair_address))
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+
+MAIN_NODE = "main node"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.sent: int = 0
+        self.accepted: int = 0
+        self.first: int = 0  # Accepted before every other endpoint
+        self.accept_time: float = 0.0  # Secs, sum over accepted
+        self.errors: int = 0
+
+
+class Broadcaster:
+    """Send a signed raw transaction to the main node & every `endpoint_uris` node in parallel
+
+    First accepted answer wins ("already known" = another endpoint propagated it first: accepted),
+    the transaction fails only if no endpoint accepts it. Per endpoint accept latency kept to prune slow ones
+    """
+
+    def __init__(self, web3: Web3, endpoint_uris: list[str], timeout: float = 10):
+        self.w3 = web3
+        self.providers = {uri: HTTPProvider(uri, request_kwargs={"timeout": timeout}) for uri in endpoint_uris}
+        self.executor = ThreadPoolExecutor(max_workers=4 * (len(self.providers) + 1))
+        self.lock = Lock()
+        self.stats: dict[str, EndpointStats] = {endpoint: EndpointStats() for endpoint in [MAIN_NODE, *self.providers]}
+
+    def send_raw_transaction(self, raw_transaction: bytes) -> HexBytes:
+        """:return: HexBytes: Transaction hash, raise ValueError (main node error first) if every endpoint refused"""
+        futures = {
+            self.executor.submit(self.send, endpoint, raw_transaction): endpoint for endpoint in self.stats.keys()
+        }
+        errors: dict[str, Exception] = {}
+        for future in as_completed(futures):
+            if future.exception() is None:
+                with self.lock:
+                    self.stats[futures[future]].first += 1
+                return future.result()
+            errors[futures[future]] = future.exception()
+        raise errors.get(MAIN_NODE, next(iter(errors.values())))
+
+    def send(self, endpoint: str, raw_transaction: bytes) -> HexBytes:
+        start = time.perf_counter()
+        txn_hash = HexBytes(Web3.keccak(raw_transaction))
+        try:
+            if endpoint == MAIN_NODE:
+                self.w3.eth.send_raw_transaction(raw_transaction)
+            else:
+                params = [HexBytes(raw_transaction).hex()]
+                response = self.providers[endpoint].make_request("eth_sendRawTransaction", params)
+                if "error" in response:
+                    raise ValueError(response["error"])
+        except Exception as e:
+            if "already known" not in str(e):
+                with self.lock:
+                    self.stats[endpoint].sent += 1
+                    self.stats[endpoint].errors += 1
+                raise
+        with self.lock:
+            stats = self.stats[endpoint]
+            stats.sent += 1
+            stats.accepted += 1
+            stats.accept_time += time.perf_counter() - start
+        return txn_hash
+
+    def print_stats(self):
+        if len(self.providers) == 0:
+            return
+        print("Info: Broadcast endpoints (accepted first / accepted / sent, mean accept latency):")
+        for endpoint, stats in self.stats.items():
+            latency = stats.accept_time / stats.accepted * 1000 if stats.accepted != 0 else 0
+            print(
+                f"Info:   {endpoint} {stats.first}/{stats.accepted}/{stats.sent}, {latency:.0f} ms, "
+                f"{stats.errors} error(s)"
+            )
@@ -0,0 +1,89 @@
+import math
+from collections import deque
+
+from web3 import Web3
+
+from helpers.settings import Settings
+from helpers.utils import *
+
+STATIC = "static"
+FAST = "fast"
+PERCENTILE = "percentile"
+GAS_SAMPLE_BLOCKS = 5  # Blocks of transaction gas prices kept for the percentile policy
+
+
+class GasOracle:
+    """Gas price (wei) of new transactions, shared by every TransactionLayer & sampled once per block
+
+    Settings.gas_policy: "static" = Settings.gas_price, "fast" = node eth_gasPrice,
+    "percentile N" = Nth percentile of the gas prices paid in the last GAS_SAMPLE_BLOCKS sampled blocks.
+    Never below Settings.gas_price nor above Settings.max_gas_price
+    """
+
+    def __init__(self, web3: Web3, settings: Settings):
+        self.w3 = web3
+        self.policy, self.percentile = parse_gas_policy(settings.gas_policy)
+        self.min_price: int = int(Decimal(settings.gas_price) * GWEI)
+        self.max_price: int = max(int(Decimal(settings.max_gas_price) * GWEI), self.min_price)
+        self.price: int = self.min_price
+        self.block_number: int = None
+        self.samples: deque[list[int]] = deque(maxlen=GAS_SAMPLE_BLOCKS)  # Gas prices paid, per block
+        self.updates: int = 0
+        self.capped: int = 0  # Updates where the policy price was above max_price
+        self.total_price: int = 0
+
+    def update(self, block_number: int):
+        """New block: sample it (one request), keep the last price on error"""
+        if self.policy == STATIC or block_number == self.block_number:
+            return
+        self.block_number = block_number
+        try:
+            price = self.fast_price() if self.policy == FAST else self.percentile_price(block_number)
+        except (ValueError, KeyError, TypeError) as e:
+            print("Warning: (Gas oracle) Keeping the last gas price:", e)
+            return
+        if price > self.max_price:
+            self.capped += 1
+        self.price = min(max(price, self.min_price), self.max_price)
+        self.updates += 1
+        self.total_price += self.price
+
+    def fast_price(self) -> int:
+        response = raw_request(self.w3, "eth_gasPrice", [])
+        if "error" in response:
+            raise ValueError(response["error"])
+        return int(response["result"], 16)
+
+    def percentile_price(self, block_number: int) -> int:
+        response = raw_request(self.w3, "eth_getBlockByNumber", [hex(block_number), True])
+        if "error" in response:
+            raise ValueError(response["error"])
+        transactions = response["result"]["transactions"] if response["result"] is not None else []
+        prices = [int(txn["gasPrice"], 16) for txn in transactions if int(txn.get("gasPrice", "0x0"), 16) > 0]
+        self.samples.append(prices)  # Validator system transactions (0 gas price) left out
+        return percentile(sorted(price for block in self.samples for price in block), self.percentile)
+
+    def print_stats(self):
+        if self.updates != 0:
+            print(
+                f"Info: Gas oracle ({self.policy}): {self.updates} block(s), "
+                f"{Decimal(self.total_price) / self.updates / GWEI:.2f} gwei mean, {self.capped} capped."
+            )
+
+
+def parse_gas_policy(gas_policy: str) -> tuple[str, int]:
+    """Settings.gas_policy -> (policy, N), unknown policies are static"""
+    words = gas_policy.lower().split()
+    if len(words) == 1 and words[0] in (STATIC, FAST):
+        return words[0], 0
+    if len(words) == 2 and words[0] == PERCENTILE and words[1].isdigit() and 0 < int(words[1]) <= 100:
+        return PERCENTILE, int(words[1])
+    print(f"Warning: Unknown gas policy '{gas_policy}', using '{STATIC}'.")
+    return STATIC, 0
+
+
+def percentile(sorted_prices: list[int], n: int) -> int:
+    """Nearest rank percentile, 0 when no price"""
+    if len(sorted_prices) == 0:
+        return 0
+    return sorted_prices[max(math.ceil(n / 100 * len(sorted_prices)) - 1, 0)]
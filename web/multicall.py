@@ -0,0 +1,32 @@
+from eth_abi import decode_abi, encode_abi
+from hexbytes import HexBytes
+from web3 import Web3
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"  # Same address on every EVM chain
+TRY_AGGREGATE = "0xbce38bd7"  # tryAggregate(bool requireSuccess, (address target, bytes callData)[] calls)
+MAX_CALLS = 500  # Calls per eth_call, keeps each aggregate under the node eth_call gas cap
+
+
+class Multicall:
+    """Aggregate many read calls into Multicall3 `tryAggregate` eth_call(s)
+
+    A reverted call doesn't fail the batch, its result is empty bytes
+    """
+
+    def __init__(self, web3: Web3, max_calls: int = MAX_CALLS):
+        self.w3 = web3
+        self.max_calls = max_calls
+
+    def call(self, calls: list[tuple[str, bytes]]) -> list[bytes]:
+        """
+        :param calls: list of (target address, call data)
+
+        :return: list[bytes]: Raw return data for each call (same order), b"" if the call reverted
+        """
+        results: list[bytes] = []
+        for i in range(0, len(calls), self.max_calls):
+            data = encode_abi(["bool", "(address,bytes)[]"], [False, calls[i : i + self.max_calls]])
+            response = self.w3.eth.call({"to": MULTICALL3, "data": TRY_AGGREGATE + data.hex()})
+            (decoded,) = decode_abi(["(bool,bytes)[]"], HexBytes(response))
+            results += [return_data if success else b"" for success, return_data in decoded]
+        return results
@@ -0,0 +1,63 @@
+from threading import Lock
+
+from web3 import Web3
+
+
+class NonceManager:
+    """Hand out wallet nonces atomically to every TransactionLayer
+
+    Thread-safe (TokenPipelines threads & asyncio engine executor threads share it),
+    nonces of transactions that weren't sent are given back & reused first so no gap blocks the next ones
+    """
+
+    def __init__(self, web3: Web3, wallet: str):
+        self.w3 = web3
+        self.wallet = wallet
+        self.lock = Lock()
+        self.released: set[int] = set()
+        self.resync()
+
+    def resync(self):
+        """Restart from the node pending transaction count (ex: after 'nonce too low')"""
+        with self.lock:
+            self.next_nonce: int = self.w3.eth.get_transaction_count(self.wallet, "pending")
+            self.released.clear()
+
+    def allocate(self) -> int:
+        """Next free nonce (lowest released one first)"""
+        with self.lock:
+            if len(self.released) != 0:
+                nonce = min(self.released)
+                self.released.remove(nonce)
+                return nonce
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def peek(self) -> int:
+        """Nonce the next allocate() returns (ex: to pre-sign a transaction)"""
+        with self.lock:
+            return min(self.released) if len(self.released) != 0 else self.next_nonce
+
+    def allocate_if(self, nonce: int) -> bool:
+        """Allocate `nonce` only if it is the next free one (pre-signed transaction still valid)"""
+        with self.lock:
+            next_nonce = min(self.released) if len(self.released) != 0 else self.next_nonce
+            if nonce != next_nonce:
+                return False
+            if len(self.released) != 0:
+                self.released.remove(nonce)
+            else:
+                self.next_nonce += 1
+            return True
+
+    def release(self, nonce: int):
+        """Give back the nonce of a transaction that wasn't sent"""
+        with self.lock:
+            if nonce >= self.next_nonce:
+                return
+            self.released.add(nonce)
+            # Shrink back while the highest handed out nonces are free
+            while self.next_nonce - 1 in self.released:
+                self.next_nonce -= 1
+                self.released.remove(self.next_nonce)
@@ -0,0 +1,183 @@
+import itertools
+import time
+from threading import Lock
+
+import numpy as np
+
+from helpers.utils import *
+
+from .transactionsLayer import TransactionLayer
+
+REL_BAND = 1e-9  # Guard band (relative) around every threshold: float64 error never hides a trigger
+ABS_BAND = 1e-17  # Guard band (price units): exact prices are quantized to 1e-18
+
+
+class OrderBook:
+    """Limit orders of every TransactionLayer as arrays (one row per layer) with pre-parsed thresholds
+
+    Each cycle, prices of every token are computed from the batched reserves & every trigger checked in one
+    vectorized float64 pass. Only rows that may fire (within a guard band) or are busy (pending transaction,
+    approval) are stepped: their TransactionLayer re-checks the trigger exactly (fixed-point ints).
+    Armed (pre-signed) orders staleness is checked the same way: nonce, gas price, re-sign time & path pairs
+    reserves they were quoted with, only rows that come out stale re-sign (see stale_armed)
+    """
+
+    def __init__(self, t_layers: list[TransactionLayer]):
+        self.t_layers = t_layers
+        size = len(t_layers)
+        self.rows: dict[int, int] = {id(t_layer): i for i, t_layer in enumerate(t_layers)}
+        self.pairs: list[str] = [t_layer.token_data.pair_contract.address for t_layer in t_layers]
+        self.pair_rows: dict[str, list[int]] = {}
+        for i, pair in enumerate(self.pairs):
+            self.pair_rows.setdefault(pair, []).append(i)
+        self.reserve0 = np.zeros(size)
+        self.reserve1 = np.zeros(size)
+        self.is_reversed = np.array([t_layer.token_data.is_reversed for t_layer in t_layers], dtype=bool)
+        self.counter_bnb = np.array([t_layer.token_data.counter_address == WBNB for t_layer in t_layers], dtype=bool)
+        self.scale = np.array([float(t_layer.PoW / ETHER) for t_layer in t_layers])  # Token / counter decimals
+        self.always = np.ones(size, dtype=bool)  # Stepped every cycle (not only waiting for a price trigger)
+        self.can_buy = np.zeros(size, dtype=bool)
+        self.buy_at = np.zeros(size)  # USD
+        self.pay_bnb = np.zeros(size, dtype=bool)  # Sell thresholds in BNB (else USD)
+        self.sell_up = np.full(size, np.inf)  # Lowest price of a take profit order not done
+        self.sell_down = np.full(size, -np.inf)  # Highest price of a stop loss order not done
+        self.lock = Lock()
+        self.dirty: set[int] = set(range(size))  # Rows whose layer stepped since loaded
+        self.evaluations: int = 0
+        self.stepped: int = 0
+        self.rearmed: int = 0  # Rows only re-signing their armed orders
+        bridges = [t_layer.token_data.path_pairs[:-1] for t_layer in t_layers]  # Path hop before the token pair
+        self.bridge_pairs: dict[str, int] = {}  # Pair (few: BNB / stable coins) -> bridge_reserves row
+        for pair in itertools.chain.from_iterable(bridges):
+            self.bridge_pairs.setdefault(pair, len(self.bridge_pairs))
+        self.bridge_reserves = np.zeros((len(self.bridge_pairs) + 1, 2))  # Last row: no bridge (always 0)
+        self.bridge_rows = np.array([self.bridge_pairs.get(pair[0], -1) if pair else -1 for pair in bridges], dtype=int)
+        self.armable = np.zeros(size, dtype=bool)
+        self.armed_nonce = np.full(size, -1, dtype=np.int64)  # -1: nothing armed
+        self.armed_gas = np.zeros(size, dtype=np.int64)
+        self.resign_time = np.full(size, np.inf)
+        self.armed_reserves = np.zeros((size, 2, 2))  # Bridge & token pair reserves quoted by the armed orders
+        tolerance = t_layers[0].settings.presign_tolerance if size != 0 else 0
+        self.quote_band = tolerance / 100 / 8  # Reserves moves (4 per 2 hops path) keeping quotes within tolerance
+
+    def mark_dirty(self, t_layer: TransactionLayer):
+        """`t_layer` stepped (any thread): its orders may have changed"""
+        with self.lock:
+            self.dirty.add(self.rows[id(t_layer)])
+
+    def load(self, i: int):
+        """Row `i` thresholds from its layer (orders only change when the layer steps)"""
+        t_layer = self.t_layers[i]
+        limit_trade = t_layer.limit_trade
+        self.always[i] = not t_layer.watching()
+        self.can_buy[i] = t_layer.qnt_bought == 0 and limit_trade.repetition >= 0
+        buy_below, sell_at = t_layer.price_thresholds()
+        self.buy_at[i] = buy_below / PRICE_ONE
+        self.pay_bnb[i] = t_layer.pay_currency == "BNB"
+        self.sell_up[i], self.sell_down[i] = np.inf, -np.inf
+        self.load_armed(i)
+        if limit_trade.repetition >= 0 and t_layer.qnt_bought > 0 and t_layer.token_data.token_balance_raw > 0:
+            for order_price, order_done in zip(sell_at, limit_trade.order_done):
+                if order_done or order_price is None:
+                    continue
+                take_profit, price_raw = order_price
+                if take_profit:
+                    self.sell_up[i] = min(self.sell_up[i], price_raw / PRICE_ONE)
+                else:
+                    self.sell_down[i] = max(self.sell_down[i], price_raw / PRICE_ONE)
+
+    def load_armed(self, i: int):
+        """Row `i` armed orders state (changes when the layer steps or re-signs)"""
+        armable, nonce, gas_price, resign_time, armed_reserves = self.t_layers[i].armed_state()
+        self.armable[i] = armable
+        self.armed_nonce[i], self.armed_gas[i], self.resign_time[i] = nonce, gas_price, resign_time
+        self.armed_reserves[i] = 0
+        for hop, pair_reserves in zip((1, 0), armed_reserves[::-1]):  # Token pair last
+            self.armed_reserves[i, hop] = pair_reserves
+
+    def update_reserves(self, reserves: dict[str, tuple[int, int]], changed: set[str] = None):
+        """Rows reserves (float64) of the pairs in `changed` (ex: ReserveMirror.changed), of every pair if None"""
+        if changed is None:
+            pair_reserves = [reserves.get(pair, (0, 0)) for pair in self.pairs]
+            flat = np.fromiter(
+                itertools.chain.from_iterable(pair_reserves), dtype=np.float64, count=2 * len(self.pairs)
+            )
+            self.reserve0, self.reserve1 = flat[0::2].copy(), flat[1::2].copy()
+            changed = self.bridge_pairs.keys()
+        else:
+            for pair in changed:
+                if pair in reserves and pair in self.pair_rows:
+                    self.reserve0[self.pair_rows[pair]] = float(reserves[pair][0])
+                    self.reserve1[self.pair_rows[pair]] = float(reserves[pair][1])
+        for pair in changed:
+            if pair in reserves and pair in self.bridge_pairs:
+                self.bridge_reserves[self.bridge_pairs[pair]] = reserves[pair]
+
+    def candidates(
+        self, reserves: dict[str, tuple[int, int]], bnb_price: Decimal, changed: set[str] = None
+    ) -> list[int]:
+        """Rows (layer indexes) to step this cycle: busy layers, triggers that may fire & pair reserves missing
+
+        :param changed: Pairs whose reserves changed since the last call, None: every pair may have changed
+        """
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        for i in dirty:
+            self.load(i)
+
+        self.update_reserves(reserves, changed)
+        missing = np.zeros(len(self.pairs), dtype=bool)
+        for pair in self.pair_rows.keys() - reserves.keys():  # Not read this cycle: the layer reads it
+            missing[self.pair_rows[pair]] = True
+        counter_reserve = np.where(self.is_reversed, self.reserve0, self.reserve1)
+        token_reserve = np.where(self.is_reversed, self.reserve1, self.reserve0)
+        missing |= token_reserve == 0
+
+        bnb = float(bnb_price)
+        with np.errstate(divide="ignore", invalid="ignore"):  # Missing reserves (0) are stepped anyway
+            ratio = counter_reserve / token_reserve * self.scale  # Token price in counter
+            price_usd = np.where(self.counter_bnb, ratio * bnb, ratio)
+            price_bnb = np.where(self.counter_bnb, ratio, ratio / bnb)
+        sell_price = np.where(self.pay_bnb, price_bnb, price_usd)
+
+        buy = self.can_buy & (price_usd < self.buy_at * (1 + REL_BAND) + ABS_BAND)
+        take_profit = sell_price >= self.sell_up * (1 - REL_BAND) - ABS_BAND
+        stop_loss = sell_price <= self.sell_down * (1 + REL_BAND) + ABS_BAND
+        step = self.always | missing | buy | take_profit | stop_loss
+
+        rows = np.flatnonzero(step).tolist()
+        self.evaluations += 1
+        self.stepped += len(rows)
+        return rows
+
+    def stale_armed(self, stepped: list[int], nonce: int, gas_price: int) -> list[int]:
+        """Rows not `stepped` this cycle (after candidates) whose armed (pre-signed) orders must be re-signed: they
+        stay sendable as is when their trigger fires. TransactionLayer.arm_orders re-checks them exactly
+
+        :param nonce: Next nonce (NonceManager.peek)
+        :param gas_price: Current gas price (GasOracle.price)
+        """
+        token_reserves = np.stack((self.reserve0, self.reserve1), axis=1)
+        drift = np.abs(np.stack((self.bridge_reserves[self.bridge_rows], token_reserves), axis=1) - self.armed_reserves)
+        armed = self.armed_nonce >= 0
+        stale = np.where(
+            armed,
+            (self.armed_nonce != nonce)
+            | (self.armed_gas != gas_price)
+            | (self.resign_time <= time.time())
+            | (drift > self.armed_reserves * self.quote_band).any(axis=(1, 2)),
+            (drift != 0).any(axis=(1, 2)),  # Nothing armed (no quote / signing failed): retry once reserves move
+        )
+        stale &= self.armable & ~self.always
+        stale[stepped] = False
+        rows = np.flatnonzero(stale).tolist()
+        self.rearmed += len(rows)
+        return rows
+
+    def print_stats(self):
+        if self.evaluations != 0:
+            print(
+                f"Info: Order book: {len(self.t_layers)} token(s), "
+                f"{self.stepped / self.evaluations:.1f} stepped per block on average, "
+                f"{self.rearmed / self.evaluations:.1f} re-armed."
+            )
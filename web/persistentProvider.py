@@ -0,0 +1,263 @@
+import asyncio
+import codecs
+import functools
+import json
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from threading import Event, Lock, Thread
+from typing import Any, AsyncIterator, Callable
+
+import aiohttp
+from web3._utils.encoding import FriendlyJsonSerde
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+RECONNECT_DELAY = 0.5  # Secs before the first reconnect (doubled per failure)
+MAX_RECONNECT_DELAY = 10.0
+
+
+class PersistentProvider(JSONBaseProvider, ABC):
+    """JSON-RPC over one persistent connection, owned by a background asyncio thread
+
+    Requests from any thread are multiplexed on the connection by JSON-RPC id & wait their own answer.
+    The connection is re-opened when lost, requests still unanswered are sent again on the new one
+    (reads are idempotent, a raw transaction sent twice is "already known") & subscriptions renewed
+    """
+
+    def __init__(self, endpoint_uri: str, timeout: float = 10):
+        super().__init__()
+        self.endpoint_uri = endpoint_uri
+        self.timeout = timeout
+        self.lock = Lock()
+        self.pending: dict[int, tuple[str, Future]] = {}  # Request id -> (payload, response future)
+        self.subscriptions: dict[str, tuple[list, Callable[[Any], None]]] = {}  # Id -> (params, on_notification)
+        self.connected = Event()
+        self.closed: bool = False
+        self.reconnects: int = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.serve(), self.loop)
+
+    def __str__(self):
+        return f"{self.__class__.__name__} connection {self.endpoint_uri}"
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": next(self.request_counter)}
+        return self.send_request([request], FriendlyJsonSerde().json_encode(request))[0]
+
+    def make_batch_request(self, calls: list[tuple[str, list]]) -> list[RPCResponse]:
+        """JSON-RPC batch (see rpc_batch), responses in `calls` order"""
+        requests = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": next(self.request_counter)}
+            for method, params in calls
+        ]
+        return self.send_request(requests, FriendlyJsonSerde().json_encode(requests))
+
+    def send_request(self, requests: list[dict], payload: str) -> list[RPCResponse]:
+        """Send `payload` (`requests` encoded), wait every response"""
+        futures = [Future() for _ in requests]
+        with self.lock:
+            for request, future in zip(requests, futures):
+                self.pending[request["id"]] = (payload if request is requests[0] else None, future)
+        asyncio.run_coroutine_threadsafe(self.send_payload(payload), self.loop)
+        try:
+            return [future.result(timeout=self.timeout) for future in futures]
+        except FutureTimeout:
+            raise TimeoutError(f"{self}: no response in {self.timeout} secs") from None
+        finally:
+            with self.lock:
+                for request in requests:
+                    self.pending.pop(request["id"], None)
+
+    def subscribe(self, params: list, on_notification: Callable[[Any], None]) -> str:
+        """eth_subscribe, `on_notification` is called on the provider thread (keep it short) with each result
+
+        :return: str: Subscription id (a new one is taken on reconnect)
+        """
+        response = self.make_request(RPCEndpoint("eth_subscribe"), params)
+        if "error" in response:
+            raise ValueError(response["error"])
+        with self.lock:
+            self.subscriptions[response["result"]] = (params, on_notification)
+        return response["result"]
+
+    def isConnected(self) -> bool:
+        return self.connected.wait(self.timeout) and super().isConnected()
+
+    def disconnect(self):
+        self.closed = True
+        asyncio.run_coroutine_threadsafe(self.close_transport(), self.loop)
+
+    async def serve(self):
+        """(Loop thread) Keep the connection open & dispatch what it receives"""
+        delay = RECONNECT_DELAY
+        while not self.closed:
+            try:
+                await self.open_transport()
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Warning: ({self}) Connection failed, retry in {delay:.1f} secs:", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+            delay = RECONNECT_DELAY
+            self.connected.set()
+            with self.lock:
+                payloads = [payload for payload, _ in self.pending.values() if payload is not None]
+            for payload in payloads:  # Unanswered on the previous connection (or sent while down)
+                await self.send_payload(payload)
+            await self.resubscribe()
+            try:
+                async for message in self.messages():
+                    self.dispatch(message)
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Warning: ({self}) Connection lost:", e)
+            self.connected.clear()
+            await self.close_transport()
+            if not self.closed:
+                self.reconnects += 1
+
+    def dispatch(self, message: str):
+        try:
+            decoded = json.loads(message)
+        except ValueError:
+            print(f"Warning: ({self}) Not JSON-RPC:", message[:100])
+            return
+        for response in decoded if isinstance(decoded, list) else [decoded]:
+            self.on_response(response)
+
+    def on_response(self, response: dict):
+        """One response / notification received"""
+        if response.get("method") == "eth_subscription":
+            with self.lock:
+                _, on_notification = self.subscriptions.get(response["params"]["subscription"], (None, None))
+            if on_notification is not None:
+                on_notification(response["params"]["result"])
+            return
+        with self.lock:
+            _, future = self.pending.get(response.get("id"), (None, None))
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    async def resubscribe(self):
+        """(Loop thread) Subscriptions ended with the previous connection: subscribe again, same callbacks"""
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+            self.subscriptions.clear()
+        for params, on_notification in subscriptions:
+            request = {"jsonrpc": "2.0", "method": "eth_subscribe", "params": params, "id": next(self.request_counter)}
+            payload = FriendlyJsonSerde().json_encode(request)
+            future = Future()
+            future.add_done_callback(functools.partial(self.resubscribed, request["id"], (params, on_notification)))
+            with self.lock:
+                self.pending[request["id"]] = (payload, future)
+            await self.send_payload(payload)
+
+    def resubscribed(self, request_id: int, subscription: tuple[list, Callable[[Any], None]], future: Future):
+        response = future.result()
+        with self.lock:
+            self.pending.pop(request_id, None)
+            if "result" in response:
+                self.subscriptions[response["result"]] = subscription
+        if "result" not in response:
+            print(f"Warning: ({self}) Subscription {subscription[0]} not renewed:", response.get("error"))
+
+    async def send_payload(self, payload: str):
+        if not self.connected.is_set():
+            return  # Sent on connect
+        try:
+            await self.write(payload)
+        except (OSError, aiohttp.ClientError) as e:  # Re-sent on reconnect
+            print(f"Warning: ({self}) Send failed:", e)
+
+    @abstractmethod
+    async def open_transport(self):
+        """Connect (raise OSError / aiohttp.ClientError / asyncio.TimeoutError on failure)"""
+
+    @abstractmethod
+    def messages(self) -> AsyncIterator[str]:
+        """Received JSON-RPC messages until the connection is closed"""
+
+    @abstractmethod
+    async def write(self, payload: str):
+        """Send one JSON-RPC payload"""
+
+    @abstractmethod
+    async def close_transport(self):
+        """Close the connection (& its session once the provider is closed)"""
+
+
+class WebsocketRpcProvider(PersistentProvider):
+    """JSON-RPC over one WebSocket (ws:// or wss://)"""
+
+    def __init__(self, endpoint_uri: str, timeout: float = 10):
+        self.session: aiohttp.ClientSession = None
+        self.websocket: aiohttp.ClientWebSocketResponse = None
+        super().__init__(endpoint_uri, timeout)
+
+    async def open_transport(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        self.websocket = await self.session.ws_connect(
+            self.endpoint_uri, timeout=self.timeout, heartbeat=30, max_msg_size=0
+        )
+
+    async def messages(self) -> AsyncIterator[str]:
+        async for message in self.websocket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                yield message.data
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                yield message.data.decode()
+            elif message.type == aiohttp.WSMsgType.ERROR:
+                raise aiohttp.ClientError(self.websocket.exception())
+
+    async def write(self, payload: str):
+        await self.websocket.send_str(payload)
+
+    async def close_transport(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.closed and self.session is not None:
+            await self.session.close()
+
+
+class IpcRpcProvider(PersistentProvider):
+    """JSON-RPC over the node Unix socket (geth.ipc path or ipc://path)"""
+
+    def __init__(self, endpoint_uri: str, timeout: float = 10):
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+        super().__init__(endpoint_uri, timeout)
+
+    async def open_transport(self):
+        path = self.endpoint_uri[len("ipc://") :] if self.endpoint_uri.startswith("ipc://") else self.endpoint_uri
+        self.reader, self.writer = await asyncio.open_unix_connection(path, limit=2**24)
+
+    async def messages(self) -> AsyncIterator[str]:
+        """IPC has no framing: messages are JSON values back to back"""
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8")()  # A chunk can end inside a character
+        buffer = ""
+        while True:
+            chunk = await self.reader.read(2**16)
+            if chunk == b"":
+                return
+            buffer += text_decoder.decode(chunk)
+            while True:
+                buffer = buffer.lstrip()
+                try:
+                    _, end = decoder.raw_decode(buffer)
+                except ValueError:  # Incomplete
+                    break
+                yield buffer[:end]
+                buffer = buffer[end:]
+
+    async def write(self, payload: str):
+        self.writer.write(payload.encode())
+        await self.writer.drain()
+
+    async def close_transport(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
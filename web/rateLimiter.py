@@ -0,0 +1,95 @@
+import random
+import time
+from threading import Lock
+from typing import Any, Callable
+
+import requests.exceptions
+from web3 import Web3
+from web3.types import RPCEndpoint, RPCResponse
+
+from .rpcPoolProvider import WRITE_METHODS
+
+MAX_RETRIES = 5
+BASE_DELAY = 0.25  # Secs, first retry backoff (doubled each retry, full jitter)
+MAX_DELAY = 8.0
+RETRY_STATUS = (429, 503)  # HTTP status retried (rate limited, node overloaded)
+RETRY_RPC_CODES = (-32005,)  # JSON-RPC "limit exceeded"
+
+
+class RateLimitMiddleware:
+    """Web3 middleware shaping requests under the node rate limit (token bucket: `rate` per sec, `burst` at once)
+
+    A rate limited request (HTTP 429/503, RPC limit exceeded) is retried alone with jittered exponential backoff,
+    the caller only sees the error after MAX_RETRIES. Writes (WRITE_METHODS: triggered orders, speed-ups) take a
+    token but never wait for one: they go before the cycle reads, which wait for the tokens they used
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.lock = Lock()
+        self.tokens: float = self.burst
+        self.last_refill = time.monotonic()
+        self.requests: int = 0
+        self.throttled: int = 0  # Requests delayed by the bucket
+        self.writes: int = 0  # Writes sent without waiting
+        self.retries: int = 0  # Rate limited requests sent again
+        self.failed: int = 0  # Requests still rate limited after MAX_RETRIES
+
+    def __call__(self, make_request: Callable[[RPCEndpoint, Any], RPCResponse], w3: Web3):
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            return self.send(lambda: make_request(method, params), method not in WRITE_METHODS)
+
+        return middleware
+
+    def acquire(self, wait: bool = True):
+        """Take a token, wait for one if the bucket is empty (unless not `wait`: the balance only goes negative)"""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1  # Reserve now, a negative balance is the wait
+            delay = -self.tokens / self.rate if self.tokens < 0 and wait else 0
+            if delay > 0:
+                self.throttled += 1
+            if not wait:
+                self.writes += 1
+        if delay > 0:
+            time.sleep(delay)
+
+    def send(self, request: Callable[[], Any], wait: bool = True) -> Any:
+        """Run `request` (one HTTP request) within the rate limit, retry it while rate limited
+
+        :param wait: Wait for a bucket token (False: writes, sent at once)
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            if self.rate > 0:
+                self.acquire(wait)
+            try:
+                response = request()
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in RETRY_STATUS:
+                    raise
+                if attempt == MAX_RETRIES:
+                    self.failed += 1
+                    raise
+            else:
+                if not is_rate_limited_response(response):
+                    return response
+                if attempt == MAX_RETRIES:
+                    self.failed += 1
+                    return response
+            self.retries += 1
+            time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2**attempt)))
+
+    def print_stats(self):
+        print(
+            f"Info: Rate limiter delayed {self.throttled}/{self.requests} request(s) ({self.writes} write(s) never), "
+            f"retried {self.retries} rate limited one(s), {self.failed} gave up."
+        )
+
+
+def is_rate_limited_response(response: Any) -> bool:
+    error = response.get("error") if isinstance(response, dict) else None
+    return isinstance(error, dict) and error.get("code") in RETRY_RPC_CODES
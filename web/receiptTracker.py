@@ -0,0 +1,92 @@
+from threading import Lock
+from typing import Callable
+
+import requests.exceptions
+from web3 import Web3
+
+from helpers.utils import raw_request, rpc_batch
+
+
+class ReceiptTracker:
+    """Fetch receipts of every pending transaction in one JSON-RPC batch (one request each if the node refuses
+    batches), once per new block
+
+    Owners track a transaction hash with a callback, called with the raw RPC receipt (dict of hex strings) when mined.
+    Replacements (same nonce, more gas) join the hash group: the first mined resolves the group
+    """
+
+    def __init__(self, web3: Web3):
+        self.w3 = web3
+        self.lock = Lock()
+        self.pending: dict[str, Callable[[dict], None]] = {}
+        self.groups: dict[str, list[str]] = {}  # Hash -> hashes sharing its nonce (replaced ones only)
+        self.block_number: int = -1
+        self.batch: bool = True  # False once the node refused a batch: one request per receipt
+
+    def track(self, txn_hash: str, on_receipt: Callable[[dict], None]):
+        with self.lock:
+            self.pending[txn_hash] = on_receipt
+
+    def replace(self, txn_hash: str, replacement_hash: str):
+        """Track `replacement_hash` (same nonce as `txn_hash`) with the `txn_hash` callback"""
+        with self.lock:
+            if txn_hash not in self.pending:  # Already resolved
+                return
+            group = self.groups.setdefault(txn_hash, [txn_hash])
+            group.append(replacement_hash)
+            self.groups[replacement_hash] = group
+            self.pending[replacement_hash] = self.pending[txn_hash]
+
+    def untrack(self, txn_hash: str):
+        """Stop tracking `txn_hash` & its replacements"""
+        with self.lock:
+            self.pop_group(txn_hash)
+
+    def pop_group(self, txn_hash: str) -> Callable[[dict], None]:
+        """(Lock held) Remove `txn_hash` group, :return: its callback, None if not tracked"""
+        on_receipt = None
+        for group_hash in self.groups.get(txn_hash, [txn_hash]):
+            self.groups.pop(group_hash, None)
+            on_receipt = self.pending.pop(group_hash, None) or on_receipt
+        return on_receipt
+
+    def poll(self, block_number: int):
+        """Fetch pending receipts if `block_number` is new"""
+        if block_number == self.block_number:
+            return
+        with self.lock:
+            hashes = list(self.pending)
+        if len(hashes) == 0:
+            self.block_number = block_number
+            return
+
+        try:
+            receipts = self.fetch_receipts(hashes)
+        except (ValueError, requests.exceptions.RequestException) as e:
+            print("Warning: (Receipts) Retry on next block:", e)
+            return
+        self.block_number = block_number
+
+        for txn_hash, receipt in zip(hashes, receipts):
+            if receipt is None:  # Not mined yet
+                continue
+            with self.lock:
+                on_receipt = self.pop_group(txn_hash)
+            if on_receipt is not None:
+                on_receipt(receipt)
+
+    def fetch_receipts(self, hashes: list[str]) -> list[dict]:
+        """Receipts of `hashes` (same order), None if not mined: one batch, one request each if batches are refused"""
+        if self.batch:
+            try:
+                return rpc_batch(self.w3, [("eth_getTransactionReceipt", [txn_hash]) for txn_hash in hashes])
+            except ValueError as e:  # Batch refused by the node
+                print("Warning: (Receipts) Batch refused, one request per receipt:", e)
+                self.batch = False
+        receipts = []
+        for txn_hash in hashes:
+            response = raw_request(self.w3, "eth_getTransactionReceipt", [txn_hash])
+            if "error" in response:
+                raise ValueError(response["error"])
+            receipts.append(response.get("result"))
+        return receipts
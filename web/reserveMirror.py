@@ -0,0 +1,128 @@
+from web3 import Web3
+
+from helpers.utils import *
+
+from .multicall import Multicall
+
+MAX_LOG_BLOCKS = 100  # Blocks missed before re-seeding from Multicall instead of replaying their Sync logs
+
+
+class ReserveMirror:
+    """In-memory reserves of every active pair, kept up to date by pair Sync events
+
+    Pairs are seeded once by a getReserves Multicall, then each new block costs one eth_getLogs over every mirrored
+    pair, whatever the number of tokens. Sync logs carry the full reserves: the last one of a pair is its state.
+    A ranged eth_getLogs never returns reorged-out logs: the applied blocks are chained by hash (parentHash) and
+    the mirror re-seeded when the chain it applied was reorged or the node doesn't have the new block yet
+    """
+
+    def __init__(self, web3: Web3, multicall: Multicall):
+        self.w3 = web3
+        self.multicall = multicall
+        self.reserves: dict[str, tuple[int, int]] = {}
+        self.block_number: int = None  # Last block applied
+        self.block_hash: str = None  # Its hash, None: unknown (re-seed)
+        self.changed: set[str] = set()  # Pairs whose reserves moved in the last sync
+        self.seeded: int = 0  # Pairs read by Multicall
+        self.log_requests: int = 0
+        self.sync_logs: int = 0
+        self.reorgs: int = 0
+
+    def sync(self, pairs: list[str], block_number: int) -> dict[str, tuple[int, int]]:
+        """Mirror `pairs` at `block_number`
+
+        :return: dict: {pair: (reserve0, reserve1)} of `pairs` mirrored (copy), missing ones could not be read
+        """
+        for pair in set(self.reserves) - set(pairs):  # No longer active
+            del self.reserves[pair]
+        self.changed = set()
+
+        block_hash = None
+        if self.block_hash is not None and 0 < block_number - self.block_number <= MAX_LOG_BLOCKS:
+            try:
+                block_hash = self.apply_logs(self.block_number + 1, block_number)
+            except (ValueError, KeyError) as e:
+                print("Warning: (Reserve mirror) Re-seeding pairs from Multicall:", e)
+                self.reserves.clear()
+        elif self.block_number != block_number:
+            self.reserves.clear()  # First sync, too many blocks missed or chain went back
+
+        self.seed([pair for pair in pairs if pair not in self.reserves])
+        self.block_number = block_number
+        self.block_hash = block_hash
+        if block_hash is None:  # Seeded: chain the next logs from this block
+            try:
+                self.block_hash = self.header(block_number)["hash"]
+            except (ValueError, KeyError) as e:
+                print("Warning: (Reserve mirror)", e)
+        return dict(self.reserves)
+
+    def header(self, block_number: int) -> dict:
+        """Block `block_number` header, ValueError if the node doesn't have it"""
+        response = raw_request(self.w3, "eth_getBlockByNumber", [hex(block_number), False])
+        if "error" in response:
+            raise ValueError(response["error"])
+        if response["result"] is None:
+            raise ValueError(f"Block {block_number} not available yet (node lagging)")
+        return response["result"]
+
+    def apply_logs(self, from_block: int, to_block: int) -> str:
+        """Replay pairs Sync logs of blocks [from_block, to_block] (one request, headers of both ends checked)
+
+        :return: str: `to_block` hash
+        :raises ValueError: Blocks applied were reorged (`from_block` parent isn't the last block applied), node
+            lagging or logs of another chain
+        """
+        first = self.header(from_block)
+        if first["parentHash"] != self.block_hash:
+            self.reorgs += 1
+            raise ValueError(f"Reorg before block {from_block}")
+        last = first if to_block == from_block else self.header(to_block)
+        if len(self.reserves) == 0:
+            return last["hash"]
+        log_filter = {
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": list(self.reserves),
+            "topics": [sync_address],
+        }
+        self.log_requests += 1
+        response = raw_request(self.w3, "eth_getLogs", [log_filter])
+        if "error" in response:
+            raise ValueError(response["error"])
+        logs = sorted(response["result"], key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+        block_hashes = {from_block: first["hash"], to_block: last["hash"]}
+        for log in logs:
+            expected = block_hashes.get(int(log["blockNumber"], 16))
+            if log.get("removed", False) or (expected is not None and log["blockHash"] != expected):
+                raise ValueError(f"Logs of a reorged block {int(log['blockNumber'], 16)}")
+        addresses = {pair.lower(): pair for pair in self.reserves}
+        for log in logs:
+            pair = addresses.get(log["address"].lower())
+            if pair is None:
+                continue
+            self.reserves[pair] = decode_reserves(HexBytes(log["data"]))
+            self.changed.add(pair)
+            self.sync_logs += 1
+        return last["hash"]
+
+    def seed(self, pairs: list[str]):
+        """Read `pairs` reserves with one Multicall, pairs failing stay out of the mirror"""
+        if len(pairs) == 0:
+            return
+        try:
+            results = self.multicall.call([(pair, GET_RESERVES) for pair in pairs])
+        except (ValueError,) as e:  # ContractLogicError is a ValueError
+            print("Warning: (Reserve mirror) Seeding pairs failed:", e)
+            return
+        for pair, data in zip(pairs, results):
+            if len(data) >= 64:
+                self.reserves[pair] = decode_reserves(data)
+                self.changed.add(pair)
+                self.seeded += 1
+
+    def print_stats(self):
+        print(
+            f"Info: Reserve mirror: {self.seeded} pair(s) seeded, {self.log_requests} eth_getLogs, "
+            f"{self.sync_logs} Sync log(s) applied, {self.reorgs} reorg(s)."
+        )
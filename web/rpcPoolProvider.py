@@ -0,0 +1,157 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Any, Callable
+
+from web3 import HTTPProvider
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from helpers.utils import http_batch_request
+
+EWMA_ALPHA = 0.2  # Weight of the newest sample in latency & error rate averages
+ERROR_PENALTY = 1.0  # Seconds added to a node score at 100% error rate
+BREAKER_FAILURES = 3  # Consecutive failures opening a node circuit breaker
+BREAKER_COOLDOWN = 30  # Seconds before an open circuit breaker lets a trial request through
+MAX_WORKERS = 32
+WRITE_METHODS = ("eth_sendRawTransaction", "eth_sendTransaction")
+LAGGING_NODE_ERRORS = ("header not found", "unknown block")  # Node behind the block reads are pinned to
+
+
+class NodeLagging(ValueError):
+    """RPC error of a node behind the requested block (answered like any RPC error: ValueError)"""
+
+
+class RpcNode:
+    """One HTTP endpoint & its health: EWMA latency & error rate, circuit breaker"""
+
+    def __init__(self, endpoint_uri: str, timeout: float):
+        self.endpoint_uri = endpoint_uri
+        self.provider = HTTPProvider(endpoint_uri, request_kwargs={"timeout": timeout})
+        self.lock = Lock()
+        self.latency: float = 0.0  # Seconds, 0 until measured (new nodes get tried first)
+        self.error_rate: float = 0.0
+        self.failures: int = 0  # Consecutive
+        self.open_until: float = 0.0  # Circuit breaker open (node skipped) until this time
+        self.requests: int = 0
+
+    def score(self) -> float:
+        """Expected response time, lower is better"""
+        return self.latency + self.error_rate * ERROR_PENALTY
+
+    def is_available(self, now: float) -> bool:
+        return self.open_until <= now
+
+    def send(self, request: Callable[[HTTPProvider], Any]) -> Any:
+        """Run `request` on this node provider & record latency / error"""
+        start = time.perf_counter()
+        try:
+            result = request(self.provider)
+            if isinstance(result, dict) and is_lagging_error(result):
+                raise NodeLagging(result["error"])
+        except Exception:
+            self.record(time.perf_counter() - start, False)
+            raise
+        self.record(time.perf_counter() - start, True)
+        return result
+
+    def record(self, elapsed: float, success: bool):
+        with self.lock:
+            self.requests += 1
+            self.error_rate += EWMA_ALPHA * ((0 if success else 1) - self.error_rate)
+            if success:
+                self.latency = elapsed if self.latency == 0 else self.latency + EWMA_ALPHA * (elapsed - self.latency)
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.failures >= BREAKER_FAILURES:  # Half-open after cooldown: next failure opens it again
+                    if self.is_available(time.time()):
+                        print(f"Warning: (RPC pool) {self.endpoint_uri} skipped for {BREAKER_COOLDOWN} secs.")
+                    self.open_until = time.time() + BREAKER_COOLDOWN
+
+    def record_slow(self, elapsed: float):
+        """Request still pending after `elapsed` secs, rank the node by it now (not once it answers)"""
+        with self.lock:
+            self.latency = max(self.latency, elapsed)
+
+
+def is_lagging_error(response: dict) -> bool:
+    error = response.get("error")
+    message = str(error.get("message", "")) if isinstance(error, dict) else str(error or "")
+    return any(lagging_error in message for lagging_error in LAGGING_NODE_ERRORS)
+
+
+class RpcPoolProvider(JSONBaseProvider):
+    """Web3 provider over many HTTP endpoints
+
+    Reads go to the best scored healthy node (EWMA latency & error rate), a read still pending after `hedge_delay`
+    seconds (or failed) is sent to the second best node too: first answer wins.
+    Writes go to the best node only, nodes failing BREAKER_FAILURES times in a row are skipped BREAKER_COOLDOWN secs
+    """
+
+    def __init__(self, endpoint_uris: list[str], hedge_delay: float, timeout: float = 10):
+        super().__init__()
+        self.nodes = [RpcNode(endpoint_uri, timeout) for endpoint_uri in endpoint_uris]
+        self.hedge_delay = hedge_delay
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.hedges: int = 0  # Reads sent to a second node
+        self.hedge_wins: int = 0  # Hedged reads answered by the second node
+
+    def __str__(self):
+        return f"RPC pool {[node.endpoint_uri for node in self.nodes]}"
+
+    def ranked_nodes(self) -> list[RpcNode]:
+        """Healthy nodes, best first (if every breaker is open, the one closing first)"""
+        now = time.time()
+        available = [node for node in self.nodes if node.is_available(now)]
+        if len(available) == 0:
+            available = [min(self.nodes, key=lambda node: node.open_until)]
+        return sorted(available, key=RpcNode.score)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        nodes = self.ranked_nodes()
+        if method in WRITE_METHODS or len(nodes) == 1:
+            return nodes[0].send(lambda provider: provider.make_request(method, params))
+        return self.hedged(nodes[0], nodes[1], lambda provider: provider.make_request(method, params))
+
+    def make_batch_request(self, calls: list[tuple[str, list]]) -> list[RPCResponse]:
+        """JSON-RPC batch (see rpc_batch), hedged like a read"""
+        nodes = self.ranked_nodes()
+        if len(nodes) == 1:
+            return nodes[0].send(lambda provider: http_batch_request(provider, calls))
+        return self.hedged(nodes[0], nodes[1], lambda provider: http_batch_request(provider, calls))
+
+    def hedged(self, primary: RpcNode, secondary: RpcNode, request: Callable[[HTTPProvider], Any]) -> Any:
+        """Send `request` to `primary`, also to `secondary` if slow or failed, first successful answer wins"""
+        future = self.executor.submit(primary.send, request)
+        futures: dict[Future, RpcNode] = {future: primary}
+        wait([future], timeout=self.hedge_delay)
+        if not future.done():
+            primary.record_slow(self.hedge_delay)
+        if not future.done() or future.exception() is not None:
+            futures[self.executor.submit(secondary.send, request)] = secondary
+            self.hedges += 1
+
+        error = None
+        pending = set(futures)
+        while len(pending) != 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures[future] is secondary:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def isConnected(self) -> bool:
+        return any(node.provider.isConnected() for node in self.nodes)
+
+    def print_stats(self):
+        print(f"Info: RPC pool hedged {self.hedges} read(s), {self.hedge_wins} answered first by the second node.")
+        for node in self.nodes:
+            state = "skipped" if not node.is_available(time.time()) else "ok"
+            print(
+                f"Info:   {node.endpoint_uri} {node.requests} request(s), latency {node.latency * 1000:.0f} ms, "
+                f"errors {node.error_rate * 100:.0f}% ({state})"
+            )
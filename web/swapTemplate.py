@@ -0,0 +1,28 @@
+from hexbytes import HexBytes
+from web3.contract import Contract
+
+WORD = 32
+SWAP_ETH_FOR_TOKENS = "swapExactETHForTokensSupportingFeeOnTransferTokens"
+
+
+class SwapTemplate:
+    """Router swap call data encoded once per (router, function, path, wallet)
+
+    Only amountIn, amountOutMin & deadline change between sends: their words are patched in a copy, no ABI work.
+    swapExact*(uint amountIn, uint amountOutMin, address[] path, address to, uint deadline) (ETH buy: no amountIn)
+    """
+
+    def __init__(self, router_contract: Contract, fn_name: str, path: list[str], wallet: str):
+        self.pays_bnb: bool = fn_name == SWAP_ETH_FOR_TOKENS  # amount in sent as value, not an argument
+        args = [0, path, wallet, 0] if self.pays_bnb else [0, 0, path, wallet, 0]
+        self.data = bytes(HexBytes(router_contract.encodeABI(fn_name=fn_name, args=args)))
+        self.amount_out_at = 4 if self.pays_bnb else 4 + WORD  # After the selector
+        self.deadline_at = self.amount_out_at + 3 * WORD
+
+    def encode(self, amount_in: int, amount_out: int, deadline: int) -> bytes:
+        data = bytearray(self.data)
+        if not self.pays_bnb:
+            data[4 : 4 + WORD] = amount_in.to_bytes(WORD, "big")
+        data[self.amount_out_at : self.amount_out_at + WORD] = amount_out.to_bytes(WORD, "big")
+        data[self.deadline_at : self.deadline_at + WORD] = deadline.to_bytes(WORD, "big")
+        return bytes(data)
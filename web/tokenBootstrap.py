@@ -0,0 +1,108 @@
+from typing import Callable
+
+from helpers.tokenPrefetch import TokenPrefetch
+from helpers.tokens import Tokens
+from helpers.utils import *
+
+from .multicall import Multicall
+
+COUNTER_ADDRESSES = [WBNB, BUSD, USDT]
+
+
+class TokenBootstrap:
+    """Prefetch TokenData reads of every token in a few Multicall calls
+
+    Phase 1: allowance, symbol, decimals, totalSupply, balanceOf & factory.getPair(token, WBNB/BUSD/USDT)
+
+    Phase 2: getReserves & token0 of every pair found
+
+    Values already in the given list[TokenPrefetch] (token cache) aren't read again
+    """
+
+    def __init__(self, multicall: Multicall, wallet: str):
+        self.multicall = multicall
+        self.wallet = wallet
+
+    def fetch(
+        self, tokens: list[Tokens], dex_list: list[dict], prefetch_list: list[TokenPrefetch] = None
+    ) -> list[TokenPrefetch]:
+        """:return: list[TokenPrefetch] matching list[Tokens] order (`prefetch_list` filled if given)"""
+        if prefetch_list is None:
+            prefetch_list = [TokenPrefetch() for _ in tokens]
+        self.run(self.token_reads(tokens, dex_list, prefetch_list))
+        self.run(self.pair_reads(prefetch_list))
+        return prefetch_list
+
+    def token_reads(
+        self, tokens: list[Tokens], dex_list: list[dict], prefetch_list: list[TokenPrefetch]
+    ) -> list[tuple[str, bytes, Callable]]:
+        """Phase 1 reads: (target, call data, on_result)"""
+        reads = []
+        for token, dex, prefetch in zip(tokens, dex_list, prefetch_list):
+            router_address = Web3.toChecksumAddress(dex["ROUTER"])
+            factory_address = Web3.toChecksumAddress(dex["FACTORY"])
+            reads += [
+                (
+                    token.address,
+                    encode_call(ALLOWANCE, self.wallet, router_address),
+                    lambda data, p=prefetch: setattr(p, "allowance", decode_uint(data)),
+                ),
+                (
+                    token.address,
+                    encode_call(BALANCE_OF, self.wallet),
+                    lambda data, p=prefetch: setattr(p, "balance", decode_uint(data)),
+                ),
+            ]
+            if prefetch.symbol is None:
+                reads.append(
+                    (token.address, SYMBOL, lambda data, p=prefetch: setattr(p, "symbol", decode_string(data)))
+                )
+            if prefetch.decimals is None:
+                reads.append(
+                    (token.address, DECIMALS, lambda data, p=prefetch: setattr(p, "decimals", decode_uint(data)))
+                )
+            if prefetch.supply is None:
+                reads.append(
+                    (token.address, TOTAL_SUPPLY, lambda data, p=prefetch: setattr(p, "supply", decode_uint(data)))
+                )
+            for counter_address in COUNTER_ADDRESSES:
+                if counter_address in prefetch.pairs:
+                    continue
+                reads.append(
+                    (
+                        factory_address,
+                        encode_call(GET_PAIR, token.address, counter_address),
+                        lambda data, p=prefetch, c=counter_address: p.pairs.update({c: decode_address(data)}),
+                    )
+                )
+        return reads
+
+    @staticmethod
+    def pair_reads(prefetch_list: list[TokenPrefetch]) -> list[tuple[str, bytes, Callable]]:
+        """Phase 2 reads: (target, call data, on_result)"""
+        reads = []
+        for prefetch in prefetch_list:
+            for pair in prefetch.pairs.values():
+                if pair == default_pair_value:
+                    continue
+                reads.append(
+                    (
+                        pair,
+                        GET_RESERVES,
+                        lambda data, p=prefetch, a=pair: p.reserves.update({a: decode_reserves(data)}),
+                    )
+                )
+                if pair not in prefetch.token0:
+                    reads.append(
+                        (pair, TOKEN0, lambda data, p=prefetch, a=pair: p.token0.update({a: decode_address(data)}))
+                    )
+        return reads
+
+    def run(self, reads: list[tuple[str, bytes, Callable]]):
+        """Send reads in Multicall & pass each successful result to its on_result"""
+        if len(reads) == 0:
+            return
+        results = self.multicall.call([(target, data) for target, data, _ in reads])
+        for (_, _, on_result), data in zip(reads, results):
+            if len(data) > 0:
+                on_result(data)
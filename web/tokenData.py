@@ -1,6 +1,8 @@
 import decimal
+from threading import Lock
 
 from helpers.settings import Settings
+from helpers.tokenPrefetch import TokenPrefetch
 from helpers.tokens import Tokens
 from helpers.utils import *
 
@@ -11,10 +13,19 @@ class TokenData:
     """Fetch Token Data:
 
     -Allowance -Symbol -Decimals -Supply -TradingPath -Token Balance
+
+    Values already in `prefetch` (token cache / Multicall bootstrap) are used instead of reading them,
+    immutable values read here are written back in `prefetch` for the token cache
     """
 
-    def __init__(self, web3, token: Tokens, settings: Settings, dex: dict, bnb_price: Decimal):
+    base_pairs: dict[tuple[str, str, str], str] = {}  # (factory, pay token, counter token) -> pair, shared
+    base_pairs_lock = Lock()
+
+    def __init__(
+        self, web3, token: Tokens, settings: Settings, dex: dict, bnb_price: Decimal, prefetch: TokenPrefetch = None
+    ):
         self.w3 = web3
+        self.prefetch = prefetch or TokenPrefetch()
         self.token = token
         self.settings = settings
         self.standard_abi: dict = standard_abi
@@ -33,7 +44,10 @@ class TokenData:
         self.error: bool = False
         self.counter_symbol: str = ""
 
-        self.allowance = get_allowance(self.token_contract, self.settings.wallet, self.router_address)
+        if self.prefetch.allowance is not None:
+            self.allowance = self.prefetch.allowance
+        else:
+            self.allowance = get_allowance(self.token_contract, self.settings.wallet, self.router_address)
 
         self.fetch_token_data()
         self.find_trading_pair()
@@ -43,17 +57,23 @@ class TokenData:
     # @timer
     def fetch_token_data(self):
         """Token symbol, decimals, & supply"""
-        self.symbol: str = self.token_contract.functions.symbol().call()
-        self.decimals: int = self.token_contract.functions.decimals().call()
+        if self.prefetch.symbol is None:
+            self.prefetch.symbol = self.token_contract.functions.symbol().call()
+        self.symbol: str = self.prefetch.symbol
+        if self.prefetch.decimals is None:
+            self.prefetch.decimals = self.token_contract.functions.decimals().call()
+        self.decimals: int = self.prefetch.decimals
         self.PoW: Decimal = Decimal(10) ** Decimal(self.decimals)
-        self.supply: Decimal = Decimal(self.token_contract.functions.totalSupply().call()) / self.PoW
+        if self.prefetch.supply is None:
+            self.prefetch.supply = self.token_contract.functions.totalSupply().call()
+        self.supply: Decimal = Decimal(self.prefetch.supply) / self.PoW
 
     # @timer
     def find_trading_pair(self):
         """Trading pair: Find & Pick the trading pair with the most Liquidity available"""
-        bnb_pair = self.factory_contract.functions.getPair(self.token.address, WBNB).call()
-        busd_pair = self.factory_contract.functions.getPair(self.token.address, BUSD).call()
-        usdt_pair = self.factory_contract.functions.getPair(self.token.address, USDT).call()
+        bnb_pair = self.get_pair(WBNB)
+        busd_pair = self.get_pair(BUSD)
+        usdt_pair = self.get_pair(USDT)
 
         if bnb_pair == default_pair_value and busd_pair == default_pair_value and usdt_pair == default_pair_value:
             self.to_print += f"Warning: {self.token.name} ({self.symbol}) No liquidity found.\n"
@@ -66,19 +86,19 @@ class TokenData:
                 pair_values_map["bnb_pair"],
                 is_bnb_reversed,
                 bnb_pair_contract,
-            ) = get_liquidity_reserve(self.w3, bnb_pair, WBNB, self.bnb_price)
+            ) = self.get_liquidity_reserve(bnb_pair, WBNB, self.bnb_price)
         if busd_pair != default_pair_value:
             (
                 pair_values_map["busd_pair"],
                 is_busd_reversed,
                 busd_pair_contract,
-            ) = get_liquidity_reserve(self.w3, busd_pair, BUSD)
+            ) = self.get_liquidity_reserve(busd_pair, BUSD)
         if usdt_pair != default_pair_value:
             (
                 pair_values_map["usdt_pair"],
                 is_usdt_reversed,
                 usdt_pair_contract,
-            ) = get_liquidity_reserve(self.w3, usdt_pair, USDT)
+            ) = self.get_liquidity_reserve(usdt_pair, USDT)
 
         max_value_key = max(pair_values_map, key=pair_values_map.get)
         round_liquidity = self.w3.fromWei(pair_values_map[max_value_key], "ether").quantize(ETHER_NEG)
@@ -112,6 +132,52 @@ class TokenData:
             f"{short_readable(round_liquidity)} USD ({short_readable(bnb_liq)} BNB)\n"
         )
 
+    def get_pair(self, counter_address: str) -> str:
+        """Pair address of token/counter token (zero address if there is no pair)"""
+        if counter_address not in self.prefetch.pairs:
+            pair = self.factory_contract.functions.getPair(self.token.address, counter_address).call()
+            self.prefetch.pairs[counter_address] = pair
+        return self.prefetch.pairs[counter_address]
+
+    def get_liquidity_reserve(
+        self, pair_address: str, counter_address: str, bnb_price: Decimal = 0
+    ) -> tuple[Decimal, bool, contract]:
+        """Pair liquidity (USD), is counter token = token0 & pair contract"""
+        if pair_address not in self.prefetch.token0:
+            liquidity, is_reversed, pair_contract = get_liquidity_reserve(
+                self.w3, pair_address, counter_address, bnb_price
+            )
+            if liquidity != 0:  # is_reversed known, token0 = counter token or our token
+                self.prefetch.token0[pair_address] = counter_address if is_reversed else self.token.address
+            return liquidity, is_reversed, pair_contract
+        pair_contract = self.w3.eth.contract(address=pair_address, abi=self.LP_abi)
+        if pair_address not in self.prefetch.reserves:  # token0 cached, only reserves to read
+            try:
+                data = fast_call(self.w3, pair_address, call_data(GET_RESERVES))
+            except (ValueError,):  # getReserves reverted
+                data = b""
+            if len(data) < 64:  # No code / not a pair: cached pair is wrong
+                self.invalidate_pair(pair_address, counter_address)
+                return Decimal(0), False, pair_contract
+            self.prefetch.reserves[pair_address] = decode_reserves(data)
+
+        reserve0, reserve1 = self.prefetch.reserves[pair_address]
+        if (reserve0 or reserve1) == 0:  # Empty pool
+            return Decimal(0), False, pair_contract
+        is_reversed = self.prefetch.token0[pair_address] == counter_address
+        return (
+            calculate_liquidity_reserve(reserve0, reserve1, is_reversed, counter_address, bnb_price),
+            is_reversed,
+            pair_contract,
+        )
+
+    def invalidate_pair(self, pair_address: str, counter_address: str):
+        """Drop a cached pair failing getReserves, WebLayer removes it from the token cache (read again next start)"""
+        self.to_print += f"Warning: {self.token.name} ({self.symbol}) Cached pair {pair_address} is invalid.\n"
+        self.prefetch.pairs.pop(counter_address, None)
+        self.prefetch.token0.pop(pair_address, None)
+        self.prefetch.invalid_pairs.append(counter_address)
+
     def find_transaction_path(self):
         """
         Transaction path: (Pay Token = BNB-BUSD-USDT)
@@ -141,11 +207,26 @@ class TokenData:
 
         self.buy_path: list[str] = tnx_path
         self.sell_path: list[str] = self.buy_path[::-1]
+        # Pair of each buy path hop (sell path hops = reversed)
+        self.path_pairs: list[str] = [self.pair_contract.address]
+        if len(tnx_path) == 3:
+            self.path_pairs.insert(0, self.get_base_pair(tnx_path[0], tnx_path[1]))
 
         self.to_print += f"Buy path : {self.buy_path_symbol}\n"
         self.to_print += f"Sell path: {self.sell_path_symbol}\n"
 
+    def get_base_pair(self, pay_address: str, counter_address: str) -> str:
+        """Pay token/counter token pair (ex: BUSD/WBNB), read once per DEX for all tokens"""
+        key = (self.factory_contract.address, pay_address, counter_address)
+        with self.base_pairs_lock:
+            if key not in self.base_pairs:
+                self.base_pairs[key] = self.factory_contract.functions.getPair(pay_address, counter_address).call()
+            return self.base_pairs[key]
+
     def fetch_token_balance(self):
-        self.token_balance_raw = get_token_balance_raw(self.token_contract, self.settings.wallet)
+        if self.prefetch.balance is not None:
+            self.token_balance_raw = Decimal(self.prefetch.balance)
+        else:
+            self.token_balance_raw = get_token_balance_raw(self.token_contract, self.settings.wallet)
         self.token_balance = self.token_balance_raw / self.PoW
         self.to_print += f"Current {self.symbol} balance: {read_balance(self.token_balance)} {self.symbol}\n"
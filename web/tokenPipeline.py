@@ -0,0 +1,134 @@
+import asyncio
+import queue
+import time
+from threading import Event, Thread
+from typing import Callable
+
+import requests.exceptions
+
+from .transactionsLayer import TransactionLayer
+
+
+class TokenPipeline:
+    """Run one TransactionLayer on its own thread, a slow token never delays the others
+
+    A trading step runs when WebLayer notify new prices (latest notification wins if the step is still busy),
+    completed transactions are put on `completed_txn` queue for WebLayer to save & `on_step` told the step (or
+    re-signing) ended.
+    Layers not stepped only re-sign their armed orders when WebLayer notify_arm (same thread: no race with steps)
+    """
+
+    def __init__(
+        self,
+        t_layer: TransactionLayer,
+        completed_txn: queue.Queue,
+        stop_bot: Callable[[], None],
+        on_step: Callable[[TransactionLayer], None] = None,
+    ):
+        self.t_layer = t_layer
+        self.completed_txn = completed_txn
+        self.stop_bot = stop_bot
+        self.on_step = on_step
+        self.stop: bool = False
+        self.full_step: bool = False  # Next run: trading step, else armed orders refresh only
+        self.new_data = Event()
+
+    def start(self):
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        """New prices available"""
+        self.full_step = True
+        self.wake()
+
+    def notify_arm(self):
+        """Armed orders stale (not trading this cycle): re-sign them"""
+        self.wake()
+
+    def wake(self):
+        self.new_data.set()
+
+    def stop_pipeline(self):
+        self.stop = True
+        self.wake()
+
+    def join(self):
+        self.thread.join()
+
+    def run(self):
+        while not self.stop:
+            self.new_data.wait()
+            self.new_data.clear()
+            if not self.stop:
+                self.run_next()
+
+    def run_next(self):
+        """Trading step if notified since the last run, else armed orders refresh"""
+        full_step, self.full_step = self.full_step, False
+        if full_step:
+            self.step()
+        else:
+            self.arm()
+
+    def step(self):
+        """One TransactionLayer limit trading step"""
+        try:
+            result = self.t_layer.start_limit_trading()
+            print(result.to_print + "--------------------")
+            if result.update_files:
+                self.completed_txn.put(result.transaction)
+        except requests.exceptions.HTTPError:
+            print("Warning: Too many requests, retry in 5 secs . . .")
+            time.sleep(5)
+        except (RuntimeError, Exception) as e:
+            print(f"Error: ({self.t_layer.t_symbol})", e)
+            self.stop_bot()
+        finally:
+            if self.on_step is not None:
+                self.on_step(self.t_layer)
+
+    def arm(self):
+        """Re-sign the TransactionLayer armed orders (no trading step, nothing printed unless it fails)"""
+        try:
+            self.t_layer.arm_orders()
+        except requests.exceptions.HTTPError:
+            print("Warning: Too many requests, retry in 5 secs . . .")
+            time.sleep(5)
+        except (RuntimeError, Exception) as e:
+            print(f"Warning: ({self.t_layer.t_symbol}) Pre-signing orders:", e)
+        finally:
+            if self.on_step is not None:
+                self.on_step(self.t_layer)
+
+
+class AsyncTokenPipeline(TokenPipeline):
+    """TokenPipeline as a task on an asyncio loop, the trading step runs on the loop executor"""
+
+    def __init__(
+        self,
+        t_layer: TransactionLayer,
+        completed_txn: queue.Queue,
+        stop_bot: Callable[[], None],
+        loop: asyncio.AbstractEventLoop,
+        on_step: Callable[[TransactionLayer], None] = None,
+    ):
+        super().__init__(t_layer, completed_txn, stop_bot, on_step)
+        self.loop = loop
+        self.async_new_data = asyncio.Event()  # Bound to the loop on first wait (Python 3.10+)
+
+    def start(self):
+        self.future = asyncio.run_coroutine_threadsafe(self.run_task(), self.loop)
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self.async_new_data.set)
+
+    def join(self):
+        self.future.result()
+
+    async def run_task(self):
+        while not self.stop:
+            await self.async_new_data.wait()
+            self.async_new_data.clear()
+            if not self.stop:
+                await asyncio.to_thread(self.run_next)
@@ -2,10 +2,19 @@ import time
 
 from web3 import exceptions
 
+from helpers.ammQuote import get_amounts_out
 from helpers.settings import Settings
 from helpers.transaction import Transaction
 from helpers.utils import *
 
+from .approvalWatcher import ApprovalWatcher
+from .armedOrder import BUY_POSITION, ArmedOrder, TriggerLatency
+from .bnbPriceFeed import BnbPriceFeed
+from .broadcaster import Broadcaster
+from .gasOracle import GasOracle
+from .nonceManager import NonceManager
+from .receiptTracker import ReceiptTracker
+from .swapTemplate import SWAP_ETH_FOR_TOKENS, SwapTemplate
 from .tokenData import TokenData
 
 
@@ -19,21 +28,35 @@ class TransactionLayer:
     3-Approve allowance
 
     4-Sell
+
+    Orders that can trigger next are kept signed for the next nonce (armed), a trigger then only sends it
     """
 
+    trigger_latency = TriggerLatency()  # Shared by every TransactionLayer
+
     def __init__(
         self,
         web3: Web3,
         token_data: TokenData,
         settings: Settings,
         dex: dict,
-        nonce: int,
+        nonce_manager: NonceManager,
+        receipt_tracker: ReceiptTracker,
+        bnb_price_feed: BnbPriceFeed,
+        broadcaster: Broadcaster,
+        gas_oracle: GasOracle,
         fail_count: int,
     ):
         self.w3 = web3
         self.token_data = token_data
         self.settings = settings
-        self.nonce = nonce
+        self.nonce_manager = nonce_manager
+        self.receipt_tracker = receipt_tracker
+        self.bnb_price_feed = bnb_price_feed
+        self.broadcaster = broadcaster
+        self.gas_oracle = gas_oracle
+        self.receipt: dict = None
+        self.nonce: int = -1
         self.fail_count = fail_count
         self.to_print: str = ""
         self.limit_trade = self.token_data.token.limit_trade
@@ -43,9 +66,25 @@ class TransactionLayer:
         self.swap_fee = Decimal(dex["FEE"])
         self.t_symbol = token_data.symbol
         self.PoW = token_data.PoW
+        self.t_pow: int = int(token_data.PoW)
         self.update_files: bool = False
         self.transaction = Transaction()
         self.txn_hex: HexBytes = HexBytes("")
+        self.reserves: dict[str, tuple[int, int]] = {}
+        self.approval_watcher: ApprovalWatcher = None
+        self.armed_orders: dict[int, ArmedOrder] = {}  # Position (BUY_POSITION or sell order index) -> order
+        self.armable: bool = False  # Orders that can trigger next exist (last arm_orders), armed or not
+        self.armed_reserves: list[tuple[int, int]] = []  # Path pairs reserves quoted by the last arm_orders
+        self.trigger_time: float = None
+        self.token_price_usd_raw: int = 0  # Fixed-point (see PRICE_ONE): trigger checks, Decimal prices for display
+        self.token_price_bnb_raw: int = 0
+        self.thresholds_key: tuple = None
+        self.thresholds: tuple[int, list[tuple[bool, int]]] = None
+        self.chain_id: int = None
+        self.swap_templates: dict[str, SwapTemplate] = {}  # BUY / SELL -> call data template
+        self.sent_transaction: dict = None  # Last transaction sent for the pending nonce (speed up base)
+        self.sent_gas_prices: dict[str, int] = {}  # Pending nonce transactions hash -> gas price
+        self.sent_block: int = -1  # Block of the last (re)send
 
     def start_limit_trading(self) -> "TransactionLayer":
         self.to_print = ""  # reset
@@ -54,6 +93,10 @@ class TransactionLayer:
         if self.pending_transaction_result():
             return self
 
+        # Wait allowance update (approve receipt without Approval log)
+        if self.approval_pending():
+            return self
+
         if self.check_allowance():
             return self
 
@@ -68,27 +111,21 @@ class TransactionLayer:
         # Get & Display token price
         self.get_token_price()
 
+        buy_below, sell_at = self.price_thresholds()
+        sell_price = self.token_price_bnb_raw if self.pay_currency == "BNB" else self.token_price_usd_raw
+
         # Sell
         if self.qnt_bought > 0 and self.token_data.token_balance_raw > 0:  # Sell
             for i in range(len(self.limit_trade.order_done)):
-                if self.limit_trade.order_done[i]:
+                if self.limit_trade.order_done[i] or sell_at[i] is None:
                     continue
 
                 # Sell when current_multi >= sell_multi on profit, Or when current_multi <= sell_multi on loss
-                if (self.current_multi >= Decimal(self.limit_trade.sell_multiplier[i]) > 100) or (
-                    self.current_multi <= Decimal(self.limit_trade.sell_multiplier[i]) < 100
-                ):
+                take_profit, order_price = sell_at[i]
+                if (sell_price >= order_price) if take_profit else (sell_price <= order_price):
 
-                    # Sell quantity (max amount = what we bought from THIS limit buy)
-                    pct_already_sold = get_sold_amount(self.limit_trade)
-                    max_pct_to_sell = min(
-                        Decimal(self.limit_trade.sell_quantity[i]),
-                        100 - pct_already_sold,
-                    )
-                    self.sell_quantity_raw = min(
-                        self.qnt_bought * max_pct_to_sell / 100,
-                        self.token_data.token_balance_raw,
-                    )
+                    self.trigger_time = time.perf_counter()
+                    self.sell_quantity_raw = self.sell_quantity_raw_for(i)
                     self.sell_quantity = self.sell_quantity_raw / self.PoW
 
                     self.tokens_left_from_ord = (self.qnt_bought - self.sell_quantity_raw) / self.PoW
@@ -98,30 +135,42 @@ class TransactionLayer:
                     status, txn_hex, error_msg = self.sell(int(self.sell_quantity_raw))
 
                     if status:
-                        self.txn_hex = txn_hex
-                        self.transaction.txn_hash = self.w3.toHex(txn_hex)
+                        self.track_transaction(txn_hex)
                         self.to_print += f"{self.t_symbol} Sell Transaction Hash: {self.transaction.txn_hash}\n"
                     else:  # reset
-                        self.nonce -= 1
+                        self.nonce_failed(error_msg)
                         self.to_print += error_msg
                         self.transaction = Transaction()
 
         # Buy
-        elif self.token_price_usd < Decimal(self.limit_trade.buy_at) and self.qnt_bought == 0:  # Buy
+        elif self.token_price_usd_raw < buy_below and self.qnt_bought == 0:  # Buy
 
+            self.trigger_time = time.perf_counter()
             status, txn_hex, error_msg = self.buy()
             self.transaction.position = "Limit Buy"
             if status:
-                self.txn_hex = txn_hex
-                self.transaction.txn_hash = self.w3.toHex(txn_hex)
+                self.track_transaction(txn_hex)
                 self.to_print += f"{self.t_symbol} Buy Transaction Hash: {self.transaction.txn_hash}\n"
             else:  # reset
-                self.nonce -= 1
+                self.nonce_failed(error_msg)
                 self.to_print += error_msg
                 self.transaction = Transaction()
 
+        self.arm_orders()
         return self
 
+    def sell_quantity_raw_for(self, order: int) -> Decimal:
+        """Sell quantity of sell order `order` (max amount = what we bought from THIS limit buy)"""
+        pct_already_sold = get_sold_amount(self.limit_trade)
+        max_pct_to_sell = min(
+            Decimal(self.limit_trade.sell_quantity[order]),
+            100 - pct_already_sold,
+        )
+        return min(
+            self.qnt_bought * max_pct_to_sell / 100,
+            self.token_data.token_balance_raw,
+        )
+
     def pending_transaction_result(self) -> bool:
         """Get pending transaction status, if we get a response update Transaction & ask WebLayer to save files (
         transaction.json, tokens.json)"""
@@ -151,8 +200,7 @@ class TransactionLayer:
                         self.limit_trade.order_done[self.limit_sell_pos] = True
 
                 else:
-                    self.token_data.allowance = approveAmount
-                    self.wait_approval_update()
+                    self.confirm_approval()
 
             else:
                 self.transaction.status = Status.FAIL.value
@@ -165,6 +213,7 @@ class TransactionLayer:
             # Reset
             self.unit_buy_price = Decimal(self.limit_trade.unit_buy_price)
             self.txn_hex = HexBytes("")
+            self.sent_transaction = None
             return True
         # Reset
         self.transaction = Transaction()
@@ -179,29 +228,29 @@ class TransactionLayer:
             self.transaction.position = APPROVE_ALLOWANCE.capitalize()
             try:
                 self.deadline = int(time.time()) + self.settings.revert_time * 60
-                self.nonce += 1
+                self.nonce = self.nonce_manager.allocate()
                 transaction = self.token_data.token_contract.functions.approve(
                     self.token_data.router_address, approveAmount
                 ).buildTransaction(
                     {
                         "from": self.settings.wallet,
-                        "gasPrice": int(Decimal(self.settings.gas_price) * GWEI),
+                        "gasPrice": self.gas_oracle.price,
                         "nonce": self.nonce,
                     }
                 )
 
-                status, txn_hex, error_msg = sign_and_send_transaction(self.w3, transaction, self.settings.private_key)
+                status, txn_hex, error_msg = self.sign_and_send(transaction)
 
                 if status:
-                    self.txn_hex = txn_hex
-                    self.transaction.txn_hash = self.w3.toHex(txn_hex)
+                    self.track_transaction(txn_hex)
                     self.to_print += f"{self.t_symbol} Approve Transaction Hash: {self.transaction.txn_hash}\n"
                 else:
-                    self.nonce -= 1
+                    self.nonce_failed(error_msg)
                     self.to_print += error_msg
                     self.transaction = Transaction()
 
             except (ValueError,) as approveError:
+                self.nonce_manager.release(self.nonce)
                 if "gas required exceeds allowance" in str(approveError):
                     self.to_print += "Error: (Low BNB): Low bnb balance to pay gas fees.\n"
                 else:
@@ -209,31 +258,239 @@ class TransactionLayer:
             return True
         return False
 
+    def nonce_failed(self, error_msg: str):
+        """Transaction not sent: give back its nonce, or resync if the node says the nonce is already used"""
+        if "(Sending transaction): Nonce" in error_msg or "same nonce" in error_msg:
+            self.nonce_manager.resync()
+        else:
+            self.nonce_manager.release(self.nonce)
+
+    def watching(self) -> bool:
+        """Only waiting for its limit order prices (no pending transaction / approval): OrderBook decides its steps"""
+        return (
+            self.txn_hex == HexBytes("")
+            and self.approval_watcher is None
+            and not (self.qnt_bought > 0 and self.token_data.allowance <= self.token_data.token_balance_raw)
+        )
+
+    def needs_price(self) -> bool:
+        """Token price will be read this cycle (no pending transaction & orders left)"""
+        return self.txn_hex == HexBytes("") and self.limit_trade.repetition >= 0
+
+    def set_reserves(self, reserves: dict[str, tuple[int, int]]):
+        """Pairs reserves {pair: (reserve0, reserve1)} read by WebLayer this cycle, pairs missing are read here"""
+        self.reserves = reserves
+
+    def price_thresholds(self) -> tuple[int, list[tuple[bool, int]]]:
+        """Limit order prices (fixed-point, exact), parsed again only when the orders change
+
+        :return: (buy when the USD price is below, [(take profit, sell at or above / at or below price) or None])
+        """
+        key = (self.limit_trade.buy_at, self.unit_buy_price, tuple(self.limit_trade.sell_multiplier))
+        if key != self.thresholds_key:
+            sell_at = []
+            for multiplier in self.limit_trade.sell_multiplier:
+                multiplier = Decimal(multiplier)
+                if multiplier == 100 or self.unit_buy_price == 0:
+                    sell_at.append(None)
+                    continue
+                price = Fraction(multiplier) * Fraction(self.unit_buy_price) / 100  # Where current_multi == multiplier
+                sell_at.append((multiplier > 100, price_bound_raw(price, multiplier > 100)))
+            self.thresholds = price_bound_raw(self.limit_trade.buy_at, True), sell_at
+            self.thresholds_key = key
+        return self.thresholds
+
     def get_token_price(self):
-        (self.token_price_usd, self.token_price_bnb, self.token_reserve, self.counter_reserve,) = get_token_price(
-            self.token_data.pair_contract,
+        pair_reserves = self.reserves.get(self.token_data.pair_contract.address)
+        if pair_reserves is None:
+            pair_reserves = fast_reserves(self.w3, self.token_data.pair_contract.address)
+        self.token_price_usd_raw, self.token_price_bnb_raw = calculate_token_price_raw(
+            *pair_reserves,
             self.token_data.is_reversed,
-            self.token_data.bnb_price,
+            self.bnb_price_feed.price_raw,  # Latest block BNB price
             self.token_data.counter_address,
-            self.PoW,
+            self.t_pow,
         )
+        self.token_price_usd = decimal_price(self.token_price_usd_raw)
+        self.token_price_bnb = decimal_price(self.token_price_bnb_raw)
 
         multiplier = ""
         if self.unit_buy_price != 0:
-            if self.pay_currency == "BNB":
-                self.current_multi = self.token_price_bnb / self.unit_buy_price * 100
-                multiplier = f"({round(self.current_multi, 2)}%)"
-            else:
-                self.current_multi = self.token_price_usd / self.unit_buy_price * 100
-                multiplier = f"({round(self.current_multi, 2)}%)"
+            price = self.token_price_bnb if self.pay_currency == "BNB" else self.token_price_usd
+            self.current_multi = price / self.unit_buy_price * 100
+            multiplier = f"({round(self.current_multi, 2)}%)"
 
         self.to_print += (
             f"{self.t_symbol} price: ".ljust(13)
-            + f"{read_balance(self.token_price_usd)} USD | ".rjust(26)
-            + f"{read_balance(self.token_price_bnb)} BNB".rjust(23)
+            + f"{read_price(self.token_price_usd_raw)} USD | ".rjust(26)
+            + f"{read_price(self.token_price_bnb_raw)} BNB".rjust(23)
             + f" {multiplier}\n"
         )
 
+    def quote_amount_out(self, path: list[str], pairs: list[str], amount_in: int) -> int:
+        """Exact swap output over every path hop from this cycle reserves (local getAmountsOut, no router call)
+
+        :return: int: Output amount, None if a hop reserves weren't read this cycle
+        """
+        if any(pair not in self.reserves for pair in pairs):
+            return None
+        return get_amounts_out(amount_in, path, [self.reserves[pair] for pair in pairs], self.swap_fee)
+
+    def sign_and_send(self, transaction: dict) -> tuple[bool, HexBytes, str]:
+        """Sign & send through the Broadcaster (main node + broadcast nodes)"""
+
+        def send_raw_transaction(raw_transaction: bytes) -> HexBytes:
+            self.record_trigger_latency(False)
+            return self.broadcaster.send_raw_transaction(raw_transaction)
+
+        self.sent_transaction = transaction
+        return sign_and_send_transaction(self.w3, transaction, self.settings.private_key, send_raw_transaction)
+
+    def record_trigger_latency(self, armed: bool):
+        if self.trigger_time is not None:
+            self.trigger_latency.record(armed, time.perf_counter() - self.trigger_time)
+            self.trigger_time = None
+
+    def swap_template(self, txn_type: str) -> SwapTemplate:
+        """Router swap call data template of BUY / SELL (token, DEX & path fixed for this layer)"""
+        if txn_type not in self.swap_templates:
+            if txn_type == BUY:
+                fn_name = (
+                    SWAP_ETH_FOR_TOKENS
+                    if self.pay_currency == "BNB"
+                    else "swapExactTokensForTokensSupportingFeeOnTransferTokens"
+                )
+                path = self.token_data.buy_path
+            else:
+                fn_name = (
+                    "swapExactTokensForETHSupportingFeeOnTransferTokens"
+                    if self.pay_currency == "BNB"
+                    else "swapExactTokensForTokensSupportingFeeOnTransferTokens"
+                )
+                path = self.token_data.sell_path
+            self.swap_templates[txn_type] = SwapTemplate(
+                self.token_data.router_contract, fn_name, path, self.settings.wallet
+            )
+        return self.swap_templates[txn_type]
+
+    def swap_transaction(
+        self, txn_type: str, amount_in: int, amount_out: int, deadline: int, nonce: int, gas_price: int
+    ) -> dict:
+        """Router swap transaction ready to sign (no RPC: chain id read once)"""
+        template = self.swap_template(txn_type)
+        if self.chain_id is None:
+            self.chain_id = self.w3.eth.chain_id
+        return {
+            "chainId": self.chain_id,
+            "nonce": nonce,
+            "gasPrice": gas_price,
+            "gas": self.settings.gas_amount,
+            "to": self.token_data.router_address,
+            "value": amount_in if template.pays_bnb else 0,
+            "data": template.encode(amount_in, amount_out, deadline),
+        }
+
+    def arm_orders(self):
+        """Sign the orders that can trigger next for the next nonce, re-sign stale ones (see ArmedOrder.is_fresh)"""
+        if not self.settings.presign_orders or self.txn_hex != HexBytes("") or self.limit_trade.repetition < 0:
+            self.armed_orders.clear()
+            self.armable = False
+            return
+
+        orders = self.armable_orders()
+        self.armed_reserves = [self.reserves.get(pair, (0, 0)) for pair in self.token_data.path_pairs]
+        self.armable = len(orders) != 0
+        nonce = self.nonce_manager.peek()
+        gas_price = self.gas_oracle.price
+        margin = self.settings.revert_time * 30  # Re-sign when half the deadline is left
+        for position in list(self.armed_orders):
+            if position not in orders:
+                del self.armed_orders[position]
+        try:
+            for position, (txn_type, amount_in) in orders.items():
+                quote = self.order_quote(txn_type, amount_in)
+                armed = self.armed_orders.get(position)
+                if quote is None or quote == 0:
+                    self.armed_orders.pop(position, None)
+                elif armed is None or not armed.is_fresh(
+                    nonce, amount_in, quote, gas_price, self.settings.presign_tolerance, margin
+                ):
+                    self.armed_orders[position] = self.sign_order(
+                        position, txn_type, nonce, amount_in, quote, gas_price
+                    )
+        except (ValueError, TypeError) as e:  # Signing error, shown when the order triggers (built at trigger)
+            print(f"Warning: ({self.t_symbol}) Pre-signing orders:", e)
+            self.armed_orders.clear()
+
+    def armable_orders(self) -> dict[int, tuple[str, int]]:
+        """Orders that can trigger next: position -> (txn type, amount in)"""
+        orders: dict[int, tuple[str, int]] = {}
+        if self.qnt_bought == 0:
+            orders[BUY_POSITION] = (BUY, int(Decimal(self.limit_trade.pay_amount) * ETHER))
+        elif self.token_data.token_balance_raw > 0:
+            for i, order_done in enumerate(self.limit_trade.order_done):
+                if not order_done:
+                    orders[i] = (SELL, int(self.sell_quantity_raw_for(i)))
+        return orders
+
+    def armed_state(self) -> tuple[bool, int, int, float, list[tuple[int, int]]]:
+        """(Any thread) what the armed orders depend on, for OrderBook staleness checks
+
+        :return: (armable, nonce (-1: none armed), gas price, re-sign time (half the deadline left),
+            path pairs reserves they were quoted with)
+        """
+        armed_orders = list(self.armed_orders.values())
+        if not self.armable or len(armed_orders) == 0:
+            return self.armable, -1, 0, math.inf, self.armed_reserves
+        armed = armed_orders[0]  # Same nonce & gas price for all
+        resign_time = min(order.deadline for order in armed_orders) - self.settings.revert_time * 30
+        return True, armed.nonce, armed.gas_price, resign_time, self.armed_reserves
+
+    def order_quote(self, txn_type: str, amount_in: int) -> int:
+        if txn_type == BUY:
+            return self.quote_amount_out(self.token_data.buy_path, self.token_data.path_pairs, amount_in)
+        return self.quote_amount_out(self.token_data.sell_path, self.token_data.path_pairs[::-1], amount_in)
+
+    def sign_order(
+        self, position: int, txn_type: str, nonce: int, amount_in: int, quote: int, gas_price: int
+    ) -> ArmedOrder:
+        slippage = Decimal(self.token_data.token.slippage)
+        amount_out = int(quote * (100 - slippage) / 100) if slippage < 100 else 0
+        deadline = int(time.time()) + self.settings.revert_time * 60
+        transaction = self.swap_transaction(txn_type, amount_in, amount_out, deadline, nonce, gas_price)
+        signed_txn = self.w3.eth.account.sign_transaction(transaction, self.settings.private_key)
+        return ArmedOrder(position, nonce, amount_in, quote, amount_out, deadline, gas_price, signed_txn.rawTransaction)
+
+    def take_armed_order(self, position: int, amount_in: int, quote: int) -> ArmedOrder:
+        """Armed order of `position` with its nonce allocated, None if missing / stale / nonce already used"""
+        armed = self.armed_orders.get(position)
+        if armed is None or quote is None:
+            return None
+        gas_price = self.gas_oracle.price
+        if not armed.is_fresh(armed.nonce, amount_in, quote, gas_price, self.settings.presign_tolerance, 0):
+            return None
+        if not self.nonce_manager.allocate_if(armed.nonce):
+            return None
+        self.armed_orders.clear()  # Other orders were signed for the same nonce
+        self.nonce, self.deadline, self.gas_price = armed.nonce, armed.deadline, armed.gas_price
+        return armed
+
+    def send_armed(self, armed: ArmedOrder) -> tuple[bool, HexBytes, str]:
+        self.record_trigger_latency(True)
+        try:
+            txn_hex = self.broadcaster.send_raw_transaction(armed.raw_transaction)
+        except (ValueError,) as vError:
+            return False, HexBytes(""), send_error_message(vError)
+        self.sent_transaction = self.swap_transaction(
+            BUY if armed.position == BUY_POSITION else SELL,
+            armed.amount_in,
+            armed.amount_out,
+            armed.deadline,
+            armed.nonce,
+            armed.gas_price,
+        )
+        return True, txn_hex, ""
+
     def buy(self) -> tuple[bool, HexBytes, str]:
         """
         Create BUY Transaction then Sign & Send it to BlockChain.
@@ -255,9 +512,12 @@ class TransactionLayer:
         pay_amount = int(self.pay_amount * ETHER)
         slippage = Decimal(self.token_data.token.slippage)
 
+        quote = self.quote_amount_out(self.token_data.buy_path, self.token_data.path_pairs, pay_amount)
         if slippage >= 100:
             amount_out = 0
-        else:
+        elif quote is not None:
+            amount_out = int(quote * (100 - slippage) / 100)
+        else:  # Estimate from main pair price
             # Deduct DEX swap fee from pay amount
             pay_amount_after_fee = self.pay_amount - (self.pay_amount * self.swap_fee / 100).quantize(ETHER_NEG)
             if self.pay_currency == "BNB":
@@ -267,50 +527,20 @@ class TransactionLayer:
             amount_out = int(amount_out * self.PoW)
 
         self.deadline = int(time.time()) + self.settings.revert_time * 60
-        self.gas_price = int(Decimal(self.settings.gas_price) * GWEI)
+        self.gas_price = self.gas_oracle.price
 
         try:
             self.to_print += (
                 f"Initiating {self.t_symbol} buy transaction: {self.transaction.pay} "
                 f"(Path: {self.token_data.buy_path_symbol}).\n"
             )
-            self.nonce += 1
-            if self.pay_currency == "BNB":
-                transaction = (
-                    self.token_data.router_contract.functions.swapExactETHForTokensSupportingFeeOnTransferTokens(
-                        amount_out,
-                        self.token_data.buy_path,
-                        self.settings.wallet,
-                        self.deadline,
-                    ).buildTransaction(
-                        {
-                            "from": self.settings.wallet,
-                            "value": pay_amount,
-                            "gasPrice": self.gas_price,
-                            "gas": self.settings.gas_amount,
-                            "nonce": self.nonce,
-                        }
-                    )
-                )
-            else:
-                transaction = (
-                    self.token_data.router_contract.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens(
-                        pay_amount,
-                        amount_out,
-                        self.token_data.buy_path,
-                        self.settings.wallet,
-                        self.deadline,
-                    ).buildTransaction(
-                        {
-                            "gasPrice": self.gas_price,
-                            "gas": self.settings.gas_amount,
-                            "from": self.settings.wallet,
-                            "nonce": self.nonce,
-                        }
-                    )
-                )
+            armed = self.take_armed_order(BUY_POSITION, pay_amount, quote)
+            if armed is not None:
+                return self.send_armed(armed)
 
-            return sign_and_send_transaction(self.w3, transaction, self.settings.private_key)
+            self.nonce = self.nonce_manager.allocate()
+            transaction = self.swap_transaction(BUY, pay_amount, amount_out, self.deadline, self.nonce, self.gas_price)
+            return self.sign_and_send(transaction)
 
         except exceptions.ContractLogicError as cl_error:
             error_msg = f"Error (Buy transaction CLE): {str(cl_error)}\n"
@@ -337,9 +567,13 @@ class TransactionLayer:
 
         slippage = Decimal(self.token_data.token.slippage)
 
+        sell_pairs = self.token_data.path_pairs[::-1]
+        quote = self.quote_amount_out(self.token_data.sell_path, sell_pairs, sell_quantity_raw)
         if slippage == 100:
             amount_out = 0
-        else:
+        elif quote is not None:
+            amount_out = int(quote * (100 - slippage) / 100)
+        else:  # Estimate from main pair price
             # Deduct DEX swap fee from pay amount
             sell_quantity_after_fee = self.sell_quantity - (self.sell_quantity * self.swap_fee / 100).quantize(
                 1 / self.PoW
@@ -351,49 +585,22 @@ class TransactionLayer:
             amount_out = int(amount_out * ETHER)
 
         self.deadline = int(time.time()) + self.settings.revert_time * 60
-        self.gas_price = int(Decimal(self.settings.gas_price) * GWEI)
+        self.gas_price = self.gas_oracle.price
 
         try:
             self.to_print += (
                 f"Initiating {self.t_symbol} sell transaction: {self.transaction.pay}, "
                 f"{self.transaction.position} (Path: {self.token_data.sell_path_symbol}).\n"
             )
-            self.nonce += 1
-            if self.pay_currency == "BNB":
-                transaction = (
-                    self.token_data.router_contract.functions.swapExactTokensForETHSupportingFeeOnTransferTokens(
-                        sell_quantity_raw,
-                        amount_out,
-                        self.token_data.sell_path,
-                        self.settings.wallet,
-                        self.deadline,
-                    ).buildTransaction(
-                        {
-                            "from": self.settings.wallet,
-                            "gasPrice": self.gas_price,
-                            "gas": self.settings.gas_amount,
-                            "nonce": self.nonce,
-                        }
-                    )
-                )
-            else:
-                transaction = (
-                    self.token_data.router_contract.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens(
-                        sell_quantity_raw,
-                        amount_out,
-                        self.token_data.sell_path,
-                        self.settings.wallet,
-                        self.deadline,
-                    ).buildTransaction(
-                        {
-                            "gasPrice": self.gas_price,
-                            "gas": self.settings.gas_amount,
-                            "from": self.settings.wallet,
-                            "nonce": self.nonce,
-                        }
-                    )
-                )
-            return sign_and_send_transaction(self.w3, transaction, self.settings.private_key)
+            armed = self.take_armed_order(self.limit_sell_pos, sell_quantity_raw, quote)
+            if armed is not None:
+                return self.send_armed(armed)
+
+            self.nonce = self.nonce_manager.allocate()
+            transaction = self.swap_transaction(
+                SELL, sell_quantity_raw, amount_out, self.deadline, self.nonce, self.gas_price
+            )
+            return self.sign_and_send(transaction)
 
         except exceptions.ContractLogicError as cl_error:
             error_msg = f"Error (Sell transaction CLE): {str(cl_error)}\n"
@@ -402,61 +609,119 @@ class TransactionLayer:
             error_msg = f"Error (Sell transaction VE): {str(ve_error)}\n"
         return False, HexBytes(""), error_msg
 
-    def wait_transaction_status(self) -> tuple[Status, Decimal]:
-        try:
-            response: TxReceipt = self.w3.eth.get_transaction_receipt(self.txn_hex)  # -> TxReceipt
-            response: dict = json.loads(Web3.toJSON(response))  # TxReceipt-> String -> dict
-            self.transaction.time = datetime_long()
-
-            status = response["status"]
-            gas_used = Decimal(response["gasUsed"])
-            amount = 0
-
-            if status == 1:
-                status = "SUCCESSFUL"
-                if self.transaction.txn_type != APPROVE_ALLOWANCE:
-                    # Token amount we bought Or Pay amount (BNB/BUSD/USDT) we got after sell
-                    amount = [item["data"] for item in response["logs"] if item["topics"][0] == transfer_address][-1]
-                    amount = int(amount, 16)  # Convert: hex -> str -> int
-            else:
-                status = "FAIL"
-
-            self.txn_gas_price = gas_used * Decimal(self.gas_price) / ETHER
-            self.transaction.gas_price = read_balance(self.txn_gas_price) + " BNB"
-            self.to_print += f"Transaction Status: {status}\nTransaction Hash: {self.transaction.txn_hash}\n"
+    def track_transaction(self, txn_hex: HexBytes):
+        """Sent transaction: wait its receipt from ReceiptTracker"""
+        self.txn_hex = txn_hex
+        self.transaction.txn_hash = self.w3.toHex(txn_hex)
+        self.receipt = None
+        self.sent_gas_prices = {self.transaction.txn_hash: self.sent_transaction["gasPrice"]}
+        self.sent_block = self.receipt_tracker.block_number
+        self.receipt_tracker.track(self.transaction.txn_hash, self.on_receipt)
 
-            return Status.SUCCESSFUL if status == "SUCCESSFUL" else Status.FAIL, Decimal(amount)  # int -> Decimal
+    def on_receipt(self, receipt: dict):
+        """ReceiptTracker callback (raw RPC receipt)"""
+        self.receipt = receipt
 
-        except (exceptions.TransactionNotFound,) as e:
-            if "not found" in str(e):
-                self.to_print += (
-                    f"{self.t_symbol} {self.transaction.txn_type} " f"transaction waiting confirmation . . .\n"
-                )
-                return Status.WAITING, Decimal(0)
-            elif self.deadline + 10 < int(time.time()):
+    def wait_transaction_status(self) -> tuple[Status, Decimal]:
+        receipt = self.receipt
+        if receipt is None:
+            if self.deadline + 10 < int(time.time()):
+                self.receipt_tracker.untrack(self.transaction.txn_hash)
                 self.to_print += (
                     "Warning: Confirmation taking too long, Automatic checking stopped, "
                     'transaction "revert time" + 10 seconds passed. Resuming and taking transaction '
                     'status as "FAIL".\n'
                 )
-            else:
-                self.to_print += (
-                    f"Error (getTransactionReceipt): {str(e)}\n" + f"{self.transaction.txn_type} transaction failed.\n"
-                )
-
-            return Status.FAIL, Decimal(0)
+                return Status.FAIL, Decimal(0)
+
+            self.to_print += f"{self.t_symbol} {self.transaction.txn_type} transaction waiting confirmation . . .\n"
+            self.speed_up()
+            return Status.WAITING, Decimal(0)
+
+        self.transaction.txn_hash = receipt["transactionHash"]  # The original or a speed up, whichever was mined
+        self.transaction.time = datetime_long()
+        status = int(receipt["status"], 16)
+        gas_used = Decimal(int(receipt["gasUsed"], 16))
+        amount = 0
+
+        if status == 1:
+            status = "SUCCESSFUL"
+            if self.transaction.txn_type != APPROVE_ALLOWANCE:
+                # Token amount we bought Or Pay amount (BNB/BUSD/USDT) we got after sell
+                amount = decode_transfer_amount(receipt)
+        else:
+            status = "FAIL"
+
+        gas_price = self.sent_gas_prices.get(receipt["transactionHash"], self.gas_price)
+        self.txn_gas_price = gas_used * Decimal(gas_price) / ETHER
+        self.transaction.gas_price = read_balance(self.txn_gas_price) + " BNB"
+        self.to_print += f"Transaction Status: {status}\nTransaction Hash: {self.transaction.txn_hash}\n"
+
+        return Status.SUCCESSFUL if status == "SUCCESSFUL" else Status.FAIL, Decimal(amount)  # int -> Decimal
+
+    def speed_up(self):
+        """Re-send the pending transaction (same nonce) with Settings.speed_up_bump % more gas once
+        Settings.speed_up_blocks blocks passed without receipt, while under the gas oracle max price"""
+        if self.settings.speed_up_blocks <= 0 or self.sent_transaction is None:
+            return
+        if self.receipt_tracker.block_number - self.sent_block < self.settings.speed_up_blocks:
+            return
+        bumped = int(self.sent_transaction["gasPrice"] * (100 + Decimal(self.settings.speed_up_bump)) / 100)
+        gas_price = max(bumped, self.gas_oracle.price)
+        if gas_price > self.gas_oracle.max_price:
+            return
+        self.sent_block = self.receipt_tracker.block_number
+        transaction = dict(self.sent_transaction, gasPrice=gas_price)
+        try:
+            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.settings.private_key)
+            txn_hash = self.w3.toHex(self.broadcaster.send_raw_transaction(signed_txn.rawTransaction))
+        except (ValueError, TypeError) as e:  # Ex: nonce too low, a transaction of this nonce was just mined
+            self.to_print += f"Warning: ({self.t_symbol}) Speed up not sent: {e}\n"
+            return
+        self.sent_transaction = transaction
+        self.sent_gas_prices[txn_hash] = gas_price
+        self.receipt_tracker.replace(self.transaction.txn_hash, txn_hash)
+        self.to_print += (
+            f"{self.t_symbol} {self.transaction.txn_type} transaction sped up to {Decimal(gas_price) / GWEI} gwei, "
+            f"Hash: {txn_hash}\n"
+        )
 
-    def wait_approval_update(self):
-        while True:
-            allowance = get_allowance(
+    def confirm_approval(self):
+        """Allowance from the approve receipt Approval log, else watch it with ApprovalWatcher (no busy-spin)"""
+        allowance = decode_approval_amount(self.receipt, self.settings.wallet, self.token_data.router_address)
+        if allowance is not None:
+            self.token_data.allowance = allowance
+            self.to_print += f"Info: (Token {self.token_data.token.name}) allowance updated.\n"
+        else:
+            self.approval_watcher = ApprovalWatcher(
                 self.token_data.token_contract,
                 self.settings.wallet,
                 self.token_data.router_address,
+                self.receipt_tracker.block_number,
+                self.settings.revert_time * 60,
             )
 
-            if allowance == approveAmount:
-                break
-        self.to_print += f"Info: (Token {self.token_data.token.name}) allowance updated.\n"
+    def approval_pending(self) -> bool:
+        """Check watched allowance (paced by ApprovalWatcher), True while not updated"""
+        if self.approval_watcher is None:
+            return False
+
+        status = self.approval_watcher.check(self.receipt_tracker.block_number)
+        if status == Status.WAITING:
+            self.to_print += f"{self.t_symbol} waiting allowance update . . .\n"
+            return True
+
+        if status == Status.SUCCESSFUL:
+            self.token_data.allowance = self.approval_watcher.allowance
+            self.to_print += f"Info: (Token {self.token_data.token.name}) allowance updated.\n"
+        else:  # Approve receipt was successful, stop checking
+            self.token_data.allowance = approveAmount
+            self.to_print += (
+                f"Warning: (Token {self.token_data.token.name}) allowance update not seen before timeout, "
+                "resuming trading.\n"
+            )
+        self.approval_watcher = None
+        return False
 
     def calculations_after_buy(self, bought_amount_raw: Decimal):
         buy_quantity_raw = bought_amount_raw
@@ -1,15 +1,34 @@
 import concurrent.futures
 import os
+import queue
 from threading import Thread
 
 import requests.exceptions
+from web3.providers.base import BaseProvider
 
 from helpers.settings import Settings
+from helpers.tokenCache import TokenCache
+from helpers.tokenPrefetch import TokenPrefetch
 from helpers.tokens import *
 from helpers.transaction import *
 from helpers.utils import *
 
+from .blockCache import BlockCacheMiddleware
+from .blockScheduler import BlockScheduler
+from .bnbPriceFeed import BnbPriceFeed
+from .broadcaster import Broadcaster
+from .gasOracle import GasOracle
+from .multicall import Multicall
+from .nonceManager import NonceManager
+from .orderBook import OrderBook
+from .persistentProvider import IpcRpcProvider, WebsocketRpcProvider
+from .rateLimiter import RateLimitMiddleware
+from .receiptTracker import ReceiptTracker
+from .reserveMirror import ReserveMirror
+from .rpcPoolProvider import RpcPoolProvider
+from .tokenBootstrap import TokenBootstrap
 from .tokenData import TokenData
+from .tokenPipeline import TokenPipeline
 from .transactionsLayer import TransactionLayer
 
 
@@ -78,25 +97,36 @@ class WebLayer(Thread):
     @divider
     @timer
     def init_web3(self):
-        """Initiate Web3 with HTTP node (For WSS you need Python 3.9)"""
-        node = self.settings.bcs_node
+        """Initiate Web3 with the node of Settings.bcs_node (HTTP, WebSocket or IPC)"""
+        self.web3 = Web3(self.create_provider(self.settings.bcs_node))
         one_minute = int(time.time())
         while True:
-            if node.startswith("w"):
-                # self.web3 = Web3(Web3.WebsocketProvider(node))
-                print("Sorry, you need python 3.9 to run WSS nodes.")
-                print("Error: As of 3.10, the *loop* parameter was removed from Lock() since it is no longer necessary")
-            else:
-                self.web3 = Web3(Web3.HTTPProvider(node))
-
             if self.web3.isConnected():
                 print("Info: Bsc node connected successfully.")
+                self.block_cache = BlockCacheMiddleware()
+                self.web3.middleware_onion.inject(self.block_cache, "block_cache", layer=0)
+                self.rate_limiter = RateLimitMiddleware(self.settings.rpc_rate_limit, self.settings.rpc_burst)
+                self.web3.middleware_onion.inject(self.rate_limiter, "rate_limit", layer=0)  # Under block cache
+                self.multicall = Multicall(self.web3)
                 break
             elif one_minute <= int(time.time()):
                 one_minute = one_minute + 60
                 print("Fail: Bsc connection failed. retry in 3 secs. . .")
             time.sleep(3)
 
+    def create_provider(self, node: str) -> BaseProvider:
+        """Provider of the `node` URL scheme: ws(s):// WebSocket, ipc:// or *.ipc path IPC, else HTTP
+        (RpcPoolProvider when Settings list extra HTTP nodes)"""
+        if node.startswith(("ws://", "wss://")):
+            return WebsocketRpcProvider(node)
+        if node.startswith("ipc://") or node.endswith(".ipc"):
+            return IpcRpcProvider(node)
+        endpoint_uris = list(dict.fromkeys([node] + [uri for uri in self.settings.rpc_nodes if uri.startswith("http")]))
+        if len(endpoint_uris) == 1:
+            return Web3.HTTPProvider(node)
+        print(f"Info: RPC pool of {len(endpoint_uris)} nodes.")
+        return RpcPoolProvider(endpoint_uris, self.settings.hedge_delay)
+
     @stop_trading
     @divider
     def account_balance(self):
@@ -125,13 +155,22 @@ class WebLayer(Thread):
         Remove tokens w/out liquidity or bought outside bot & save in list[TokenData]
         """
         self.init_tokens_dex()
+        self.block_cache.pin(self.web3.eth.block_number)  # Tokens sharing pairs read them once
         self.bnb_price = get_bnb_price(self.web3)
+        self.bnb_price_feed = BnbPriceFeed(self.web3, self.bnb_price)
+        self.token_cache = TokenCache()
+        TokenData.base_pairs.update(self.token_cache.all_pairs())
         try:
             self.tokens_data: list[TokenData] = []
+            prefetch_list = self.prefetch_token_data()
             with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                results = executor.map(self.work, self.tokens, self.dex_list)
+                results = executor.map(self.work, self.tokens, self.dex_list, prefetch_list)
 
                 for i, result in enumerate(results):
+                    factory, token_address = result.factory_contract.address, result.token.address
+                    self.token_cache.put(factory, token_address, result.prefetch)
+                    for counter_address in result.prefetch.invalid_pairs:  # Cached pairs failing getReserves
+                        self.token_cache.invalidate(factory, token_address, counter_address)
                     print(result.to_print)
                     if not result.error and result.token.limit_trade.repetition > -1:
                         self.tokens_data.append(result)
@@ -140,6 +179,8 @@ class WebLayer(Thread):
                     else:
                         print(f"Bot will not trade with Token '{self.tokens[i].name}'.\n")
 
+                self.save_token_cache()
+
                 if len(self.tokens_data) == 0:
                     print("After filtering, no token available to trade with.")
                     self.stop_thread()
@@ -167,15 +208,44 @@ class WebLayer(Thread):
                 else self.pancake_swap
             )
 
-    def work(self, token: Tokens, dex: dict) -> TokenData:
-        return TokenData(self.web3, token, self.settings, dex, self.bnb_price)
+    def cached_prefetch_list(self) -> list[TokenPrefetch]:
+        """Token cache values, list[TokenPrefetch] match list[Tokens]"""
+        return [
+            self.token_cache.get(Web3.toChecksumAddress(dex["FACTORY"]), token.address)
+            for token, dex in zip(self.tokens, self.dex_list)
+        ]
+
+    def prefetch_token_data(self) -> list[TokenPrefetch]:
+        """Token cache + Multicall bootstrap when enabled in Settings, list[TokenPrefetch] match list[Tokens]"""
+        prefetch_list = self.cached_prefetch_list()
+        if self.settings.multicall_bootstrap:
+            try:
+                bootstrap = TokenBootstrap(self.multicall, self.settings.wallet)
+                return bootstrap.fetch(self.tokens, self.dex_list, prefetch_list)
+            except (ValueError,) as e:
+                print("Warning: (Multicall bootstrap) Fetching token data one by one:", e)
+        return prefetch_list
+
+    def save_token_cache(self):
+        """Add shared base pairs (ex: BUSD/WBNB) to the token cache & save it"""
+        for (factory, pay_address, counter_address), pair in TokenData.base_pairs.items():
+            self.token_cache.put(factory, pay_address, TokenPrefetch(pairs={counter_address: pair}))
+        self.token_cache.save()
+
+    def work(self, token: Tokens, dex: dict, prefetch: TokenPrefetch) -> TokenData:
+        return TokenData(self.web3, token, self.settings, dex, self.bnb_price, prefetch)
 
     @stop_trading
     def create_transactions_layer_list(self):
         """Create list[TransactionLayer] from list[TokenData] left after filtering"""
         self.init_token_data_dex()
         self.transactions_layer: list[TransactionLayer] = []
-        self.nonce = get_nonce(self.web3, self.settings.wallet)
+        self.nonce_manager = NonceManager(self.web3, self.settings.wallet)
+        self.receipt_tracker = ReceiptTracker(self.web3)
+        self.broadcaster = Broadcaster(
+            self.web3, [uri for uri in self.settings.broadcast_nodes if uri.startswith("http")]
+        )
+        self.gas_oracle = GasOracle(self.web3, self.settings)
         for i in range(len(self.tokens_data)):
             self.transactions_layer.append(
                 TransactionLayer(
@@ -183,7 +253,11 @@ class WebLayer(Thread):
                     self.tokens_data[i],
                     self.settings,
                     self.dex_list[i],
-                    self.nonce,
+                    self.nonce_manager,
+                    self.receipt_tracker,
+                    self.bnb_price_feed,
+                    self.broadcaster,
+                    self.gas_oracle,
                     self.fail_count,
                 )
             )
@@ -206,43 +280,87 @@ class WebLayer(Thread):
                 else self.pancake_swap
             )
 
+    @stop_trading
     def main_loop(self):
-        while not self.stop:
-            self.start_trading()
-            if self.settings.max_fail_attempts <= self.fail_count:
-                print("========================================")
-                print(
-                    f'WARNING: Bot reached "Max Fail Transactions" ({self.settings.max_fail_attempts}) '
-                    "set in Settings.\n"
-                    "Info: Pressing 'START' will reset 'Max Fail Transactions Counter'."
-                )
-                self.stop_thread()
+        """Run one trading cycle per new block, each TransactionLayer trades on its own TokenPipeline"""
+        self.completed_txn: queue.Queue[Transaction] = queue.Queue()
+        self.order_book = OrderBook(self.transactions_layer)
+        self.reserves: dict[str, tuple[int, int]] = {}
+        self.reserves_changed: set[str] = None  # Pairs moved since last cycle (ReserveMirror), None: unknown
+        self.reserve_mirror: ReserveMirror = None  # Settings.reserve_source "multicall": reserves read every block
+        if self.settings.reserve_source == "logs":
+            self.reserve_mirror = ReserveMirror(self.web3, self.multicall)
+        self.block_scheduler = BlockScheduler(
+            self.web3, self.settings.block_poll_interval, self.settings.head_subscription
+        )
+        self.pipelines: list[TokenPipeline] = []
+        try:
+            for t_layer in self.transactions_layer:
+                self.pipelines.append(self.create_pipeline(t_layer))
+                self.pipelines[-1].start()
+            while self.wait_new_block():
+                self.start_trading()
+                self.check_fail_count()
+        finally:  # Whatever ended the loop: stop pipelines & save what they completed
+            self.stop_thread()
+            self.stop_pipelines()
+
+    def wait_new_block(self) -> bool:
+        """BlockScheduler.wait_new_block, stop trading on error (like start_trading)"""
+        try:
+            return self.block_scheduler.wait_new_block(lambda: self.stop)
+        except (RuntimeError, Exception) as e:
+            print("Error: (Main) Block polling:", e)
+            self.stop_thread()
+            return False
+
+    def stop_pipelines(self):
+        """Stop every TokenPipeline, save transactions completed while stopping & print stats"""
+        print("Info: Waiting for pending token steps . . .")
+        for pipeline in self.pipelines:
+            pipeline.stop_pipeline()
+        for pipeline in self.pipelines:
+            pipeline.join()
+        self.save_completed_transactions()  # Transactions completed while stopping
+        self.block_scheduler.print_stats(len(self.transactions_layer))
+        self.block_cache.print_stats()
+        self.rate_limiter.print_stats()
+        self.broadcaster.print_stats()
+        self.gas_oracle.print_stats()
+        self.order_book.print_stats()
+        if self.reserve_mirror is not None:
+            self.reserve_mirror.print_stats()
+        TransactionLayer.trigger_latency.print_stats()
+        if isinstance(self.web3.provider, RpcPoolProvider):
+            self.web3.provider.print_stats()
+
+    def create_pipeline(self, t_layer: TransactionLayer) -> TokenPipeline:
+        return TokenPipeline(t_layer, self.completed_txn, self.stop_thread, self.order_book.mark_dirty)
+
+    def check_fail_count(self):
+        if self.settings.max_fail_attempts <= self.fail_count:
+            print("========================================")
+            print(
+                f'WARNING: Bot reached "Max Fail Transactions" ({self.settings.max_fail_attempts}) '
+                "set in Settings.\n"
+                "Info: Pressing 'START' will reset 'Max Fail Transactions Counter'."
+            )
+            self.stop_thread()
 
     @divider
     @timer
     def start_trading(self):
-        """Initiate trading from list[TransactionLayer]"""
+        """Publish new prices to the TokenPipelines the OrderBook selects & save transactions they completed"""
         try:
-            completed_txn: list[Transaction] = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                results = executor.map(self.init_transaction_layer, range(len(self.transactions_layer)))
-                for index, result in enumerate(results):
-                    print(result.to_print[:-1])  # Remove last \n
-                    print("--------------------")
-
-                    if result.update_files:
-                        completed_txn.append(result.transaction)
-
-            if len(completed_txn) != 0:
-                self.save_transactions(completed_txn)
-                self.save_tokens()
-
-                if self.check_tokens_limit_orders_left():
-                    self.account_balance()
-                else:
-                    print("========================================")
-                    print("Info: All Tokens Limit Buy/Sell orders are filled.")
-                    self.stop_thread()
+            self.block_cache.pin(self.block_scheduler.block_number)  # This cycle reads see one block
+            self.read_cycle()
+            self.block_scheduler.record_evaluation()
+            rows = self.order_book.candidates(self.reserves, self.bnb_price_feed.price, self.reserves_changed)
+            for i in rows:
+                self.pipelines[i].notify()
+            for i in self.order_book.stale_armed(rows, self.nonce_manager.peek(), self.gas_oracle.price):
+                self.pipelines[i].notify_arm()
+            self.save_completed_transactions()
 
         except requests.exceptions.HTTPError:
             print("Warning: Too many requests, retry in 5 secs . . .")
@@ -251,8 +369,62 @@ class WebLayer(Thread):
             print("Error: (Main)", e)
             self.stop_thread()
 
-    def init_transaction_layer(self, index: int):
-        return self.transactions_layer[index].start_limit_trading()
+    def read_cycle(self):
+        """This cycle reads: gas price, reserves (& BNB price) and pending receipts"""
+        self.gas_oracle.update(self.block_scheduler.block_number)
+        self.fetch_reserves()
+        self.receipt_tracker.poll(self.block_scheduler.block_number)
+
+    def save_completed_transactions(self):
+        """Drain TokenPipelines completed transactions queue & save files"""
+        completed_txn: list[Transaction] = []
+        while not self.completed_txn.empty():
+            completed_txn.append(self.completed_txn.get_nowait())
+        self.fail_count += len([txn for txn in completed_txn if txn.status == Status.FAIL.value])
+
+        if len(completed_txn) != 0:
+            self.save_transactions(completed_txn)
+            self.save_tokens()
+
+            if self.check_tokens_limit_orders_left():
+                self.account_balance()
+            else:
+                print("========================================")
+                print("Info: All Tokens Limit Buy/Sell orders are filled.")
+                self.stop_thread()
+
+    def fetch_reserves(self):
+        """Read all active pairs reserves (every path hop) & BUSD/WBNB pair in one Multicall (or from the
+        ReserveMirror when Settings.reserve_source is "logs"), hand them to list[TransactionLayer] & BnbPriceFeed
+
+        On Multicall error, every TransactionLayer reads its own pair reserves (fallback)
+        """
+        active_layers = [t_layer for t_layer in self.transactions_layer if t_layer.needs_price()]
+        pairs = list(dict.fromkeys(pair for t_layer in active_layers for pair in t_layer.token_data.path_pairs))
+        reserves: dict[str, tuple[int, int]] = {}
+        self.reserves_changed = None
+
+        if len(pairs) != 0:
+            bnb_pair = self.bnb_price_feed.pair_address
+            pairs = list(dict.fromkeys([bnb_pair] + pairs))
+            if self.reserve_mirror is not None:
+                reserves = self.reserve_mirror.sync(pairs, self.block_scheduler.block_number)
+                self.reserves_changed = self.reserve_mirror.changed
+            else:
+                try:
+                    results = self.multicall.call([(pair, GET_RESERVES) for pair in pairs])
+                    reserves = {pair: decode_reserves(data) for pair, data in zip(pairs, results) if len(data) >= 64}
+                except (ValueError,) as e:  # ContractLogicError is a ValueError
+                    print("Warning: (Multicall) Reading reserves one by one:", e)
+
+            if bnb_pair in reserves:
+                self.bnb_price_feed.update(reserves[bnb_pair])
+            else:
+                self.bnb_price_feed.refresh()
+
+        self.reserves = reserves
+        for t_layer in self.transactions_layer:
+            t_layer.set_reserves(reserves)
 
     @staticmethod
     def save_transactions(completed_txn: list[Transaction]):